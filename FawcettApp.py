@@ -3,26 +3,20 @@
 __version__ = "6.0.0"
 
 import argparse
-from copy import deepcopy
+import copy
 from datetime import datetime, date
+from io import BytesIO
 import json
-from json import JSONDecodeError
 import logging
 from logging.handlers import RotatingFileHandler
+import multiprocessing
 import os
-from os import system as os_system
-from os import name as OS_NAME
 from pathlib import Path
 import platform
-import re
-from socket import timeout
-import ssl
+import subprocess
 import sys
-from tempfile import mkstemp
-from typing import Optional, Any
-from threading import Thread
-import urllib.request
-from urllib.error import HTTPError, URLError
+import time
+from typing import Any, Dict, Iterator, List, Optional, Set, Tuple
 import webbrowser
 
 from PyQt5 import QtWidgets
@@ -30,7 +24,8 @@ from PyQt5 import QtCore
 from PyQt5 import QtGui  # noqa: F401
 from lxml import html
 from lxml.html.builder import H3, H4, CLASS, P, SPAN, STRONG
-from lxml.etree import _Element, Element, iselement
+from lxml.etree import _Element, Element, htmlfile, iselement
+from requests import RequestException
 
 # from lxml.etree import Element
 
@@ -40,16 +35,98 @@ from package.MainWindow_ui import Ui_MainWindow
 # v6: Import order paper scripts
 from package.order_paper import order_paper
 
-# print(sys.version)
+# shared HTTP client (keep-alive, retries and circuit breaker)
+import package.http_client as http_client
+
+# for the Word version of the proof
+from package.docx_writer import write_docx
+
+# highlighting of mistakes in question text
+from package.highlighting import (
+    HighlightFragment,
+    HighlightJob,
+    highlight_fragments,
+    highlight_questions,
+    parse_fragment,
+)
+
+# handing requests to a resident Fawcett
+from package.resident import Request, ResidentServer, send_request
+
+# inline styles for proofs that work without the network
+from package.offline_styles import (
+    ORDER_PAPER_CSS,
+    QUESTIONS_TABLED_CSS,
+    inline_styles,
+    with_inline_styles,
+)
+
+# sections and a table of contents for very large proofs
+from package.sections import (
+    SECTION_CLASS,
+    SECTION_CLASSES,
+    SECTION_TAGS,
+    TocGroup,
+    add_section_styles,
+    section_id,
+    toc_element,
+    use_sections,
+)
+
+# recently made proofs, reused if the data has not changed
+from package.proof_store import ProofStore, content_hash
+
+# decoding the EQM feed
+from package.eqm_feed import (
+    NAMEDDAY,
+    ORDINARY,
+    SUBSTANTIVE,
+    TOPICAL,
+    Question,
+    QuestionBlock,
+    answering_body_targets,
+    count_questions,
+    decode_feed,
+)
 
-# default ssl context
-CONTEXT = ssl.create_default_context()
+# print(sys.version)
 
 NOQ_URI_BASE = (
     "https://api.eqm.parliament.uk/feed/NoticeOfQuestions.json?preview=true&tabledDate="
 )
 MNIS_ANSWERING_BODIES_URI = "http://data.parliament.uk/membersdataplatform/services/mnis/ReferenceData/AnsweringBodies/"
 
+# where the questions go in the HTML template
+QUESTIONS_DIV_PATH = 'body//div[@class="questions"]'
+
+# the tags and classes renderQuestions (and highlighting) can add to the
+# template. Offline styles for these are kept even though they are added later
+QUESTION_TAGS = ("h3", "h4", "p", "span", "strong")
+QUESTION_CLASSES = (
+    "questionContainer",
+    "questionNumber",
+    "memberName",
+    "memberConstituency",
+    "questionText",
+    "uin",
+    "marker",
+    "marker-pink",
+)
+
+# stored under this name in the proof store
+PROOF_TYPE = "QsTabled"
+
+# a long running Fawcett (e.g. a resident one) reuses the MNIS reference data
+# for this long (seconds) rather than fetching it for every proof
+REFERENCE_DATA_MAX_AGE = 60 * 60
+
+# uri: (time fetched, data)
+_reference_data: Dict[str, Tuple[float, Any]] = {}
+# template path: (modified time, bytes, parsed template)
+_templates: Dict[Path, Tuple[float, bytes, Any]] = {}
+
+proof_store = ProofStore()
+
 logger = logging.getLogger("fawcett_app")
 logger.setLevel(logging.DEBUG)
 
@@ -90,17 +167,31 @@ warning = cmd_warning
 error = cmd_error
 
 
-class StartWordInBackground(Thread):
-    def __init__(self, path_to_word_file):
-        self.path_to_word_file = path_to_word_file
-        super().__init__()
+#
+# function to show an HTML proof. This is redefined later if using GUI.
+# html_text is the proof as written to file_path, if it is already in memory,
+# and stylesheet the offline styles for it (see offline_styles), for showing
+# it without the network.
+#
+
+
+def browser_show_proof(
+    file_path: str, title: str = "", html_text: str = "", stylesheet: str = ""
+):
+    # try to open in a web browser
+    try:
+        if os.name == "posix":
+            webbrowser.open("file://" + file_path)
+        else:
+            webbrowser.open(file_path)
+    except Exception:
+        warning(
+            f"The following HTML file was created:\n{file_path}\n"
+            "but could not be opened automatically."
+        )
+
 
-    def run(self):
-        # fist try opening a copy of the word file using the winword.exe
-        # assume winword is in default location
-        winword = r'"C:\Program Files (x86)\Microsoft Office\root\Office16\winword.exe"'
-        option = " /f "  # supposed to tell word to open a copy
-        os_system(winword + option + self.path_to_word_file)
+show_proof = browser_show_proof
 
 
 def main():
@@ -108,8 +199,14 @@ def main():
     # get today's date as a date object
     today = date.today()
 
+    # do cmd line version if there is a date
+    chosen_date: Optional[date] = None
+    word = False
+    offline = False
+    sectioned: Optional[bool] = None
+    keep_resident = False
+
     if len(sys.argv) > 1:
-        # do cmd line version
         parser = argparse.ArgumentParser(
             description="Create Questions Tabled On Quick Proof"
         )
@@ -118,13 +215,67 @@ def main():
 
         parser.add_argument(
             "date",
+            nargs="?",
             type=lambda s: datetime.strptime(s, "%Y-%m-%d"),
             help=f"Enter the date in the form YYYY-MM-DD. E.g. {today_str}",
         )
 
+        parser.add_argument(
+            "--word",
+            action="store_true",
+            help="Create a Word (.docx) version instead of HTML",
+        )
+
+        parser.add_argument(
+            "--offline",
+            action="store_true",
+            help="Put the styles in the HTML file so it can be opened without "
+            "the network",
+        )
+
+        parser.add_argument(
+            "--sections",
+            action="store_true",
+            help="Put each answering body in its own section, with a table of "
+            "contents, even if the proof is not large",
+        )
+
+        parser.add_argument(
+            "--resident",
+            action="store_true",
+            help="Start the GUI and keep it running in the system tray so "
+            "Fawcett starts straight away next time",
+        )
+
         args = parser.parse_args(sys.argv[1:])
 
-        run(args.date)
+        if args.date is None and not args.resident:
+            parser.error("a date is required")
+        if args.date is not None and args.resident:
+            parser.error("--resident starts the GUI, so can't be used with a date")
+
+        chosen_date, word, keep_resident = args.date, args.word, args.resident
+        offline = args.offline
+        if args.sections:
+            sectioned = True
+
+    # if there is a resident Fawcett already running let it do the work
+    if chosen_date is None:
+        request: Request = {"command": "show"}
+    else:
+        request = {
+            "command": "run",
+            "date": f"{chosen_date:%Y-%m-%d}",
+            "word": word,
+            "offline": offline,
+            "sections": sectioned,
+        }
+    if send_request(request):
+        logger.info(f"Sent to the resident Fawcett: {request}")
+        return
+
+    if chosen_date is not None:
+        run(chosen_date, word=word, offline=offline, sectioned=sectioned)
 
     else:
         # run the GUI version
@@ -141,17 +292,97 @@ def main():
             cmd_error(msg)
             QtWidgets.QMessageBox.critical(window, "Error", msg)
 
+        def gui_show_proof(
+            file_path: str, title: str = "", html_text: str = "", stylesheet: str = ""
+        ):
+            if window.preview_checkbox.isChecked():
+                if not html_text:
+                    try:
+                        html_text = Path(file_path).read_text(encoding="utf-8")
+                    except OSError as e:
+                        warning(f"Could not read {file_path}\n{e}")
+                        return
+                # the preview pane can't load stylesheets from the internet
+                preview_text = with_inline_styles(html_text, stylesheet)
+                window.showPreview(preview_text, file_path, title)
+            else:
+                browser_show_proof(file_path, title)
+
         # redefine global function
         global warning
         warning = gui_warning
         global error
         error = gui_error
+        global show_proof
+        show_proof = gui_show_proof
 
         window.show()
 
+        if keep_resident:
+            # the server and tray icon must live as long as the app
+            resident_server = makeResident(app, window)  # noqa: F841
+
         app.exec_()
 
 
+def makeResident(app, window) -> ResidentServer:
+    """Keep running in the system tray and do the work for later launches."""
+
+    def show_window():
+        window.show()
+        window.raise_()
+        window.activateWindow()
+
+    def handle_request(request: Request):
+        logger.info(f"Request from another launch: {request}")
+        if request.get("command") == "show":
+            show_window()
+        elif request.get("command") == "run":
+            try:
+                chosen_date = date.fromisoformat(request["date"])
+            except (KeyError, TypeError, ValueError):
+                error(f"{request.get('date')}  seems  not to be a valid date.")
+                return
+            run(
+                chosen_date,
+                word=bool(request.get("word")),
+                offline=bool(request.get("offline")),
+                sectioned=request.get("sections"),
+            )
+
+    def tray_activated(reason):
+        # i.e. clicked
+        if reason == QtWidgets.QSystemTrayIcon.Trigger:
+            show_window()
+
+    resident_server = ResidentServer(handle_request, app)
+    if not resident_server.listen():
+        warning(
+            "Could not start the resident Fawcett:\n"
+            + resident_server.server.errorString()
+        )
+        return resident_server
+
+    if QtWidgets.QSystemTrayIcon.isSystemTrayAvailable():
+        icon = window.windowIcon()
+        if icon.isNull():
+            icon = app.style().standardIcon(QtWidgets.QStyle.SP_ComputerIcon)
+        tray_icon = QtWidgets.QSystemTrayIcon(icon, resident_server)
+        tray_icon.setToolTip("Fawcett")
+
+        tray_menu = QtWidgets.QMenu(window)
+        tray_menu.addAction("Open Fawcett", show_window)
+        tray_menu.addAction("Quit", app.quit)
+        tray_icon.setContextMenu(tray_menu)
+        tray_icon.activated.connect(tray_activated)
+        tray_icon.show()
+
+        # closing the window just hides it
+        app.setQuitOnLastWindowClosed(False)
+
+    return resident_server
+
+
 class MainWindow(QtWidgets.QMainWindow, Ui_MainWindow):
     def __init__(self, *args, obj=None, **kwargs):
         super(MainWindow, self).__init__(*args, **kwargs)
@@ -183,6 +414,22 @@ class MainWindow(QtWidgets.QMainWindow, Ui_MainWindow):
         # log button
         self.logBtn.clicked.connect(self.open_log)
 
+        # the preview pane is shown when there is a proof to show in it
+        self.preview_frame.hide()
+        self.preview_path = ""
+        self.preview_title = ""
+        self.open_in_browser_btn.clicked.connect(
+            lambda: browser_show_proof(self.preview_path)
+        )
+        self.preview_checkbox.toggled.connect(self.previewToggled)
+        self.preview_scroll_to: Optional[List[int]] = None
+        for scroll_bar in (
+            self.preview_browser.horizontalScrollBar(),
+            self.preview_browser.verticalScrollBar(),
+        ):
+            scroll_bar.rangeChanged.connect(self.restorePreviewScroll)
+            scroll_bar.actionTriggered.connect(self.previewScrolled)
+
     def run_word_script(self):
         _date = self.dateEdit.date().toPyDate()
 
@@ -206,7 +453,30 @@ class MainWindow(QtWidgets.QMainWindow, Ui_MainWindow):
         if self.checkBox_3_OP.isChecked():
             _shopping_list.append("futurea")
 
-        order_paper(str(_date), _shopping_list)
+        # unchecked lets order_paper section large proofs
+        sectioned = True if self.sections_checkbox_OP.isChecked() else None
+        # 0 is all on one page
+        page_size = self.page_size_spinBox_OP.value() or None
+
+        rendered: List[str] = []
+        output_file_path = order_paper(
+            str(_date),
+            _shopping_list,
+            open_browser=False,
+            sectioned=sectioned,
+            page_size=page_size,
+            warning=warning,
+            rendered=rendered.append,
+        )
+        if output_file_path is None:
+            # the problem has already been reported
+            return
+        show_proof(
+            str(output_file_path),
+            f"Order Paper for {_date:%d %B %Y}",
+            rendered[0],
+            ORDER_PAPER_CSS,
+        )
 
     def run_script(self):
 
@@ -216,6 +486,57 @@ class MainWindow(QtWidgets.QMainWindow, Ui_MainWindow):
 
         run(_date)
 
+    def showPreview(self, html_text: str, file_path: str, title: str):
+        """Show an HTML proof, written to file_path, in the preview pane.
+
+        If the pane is already showing a version of the same proof (same
+        title) it is updated in place, keeping the scroll position.
+        """
+        browser = self.preview_browser
+        scroll_bars = (browser.horizontalScrollBar(), browser.verticalScrollBar())
+        positions = [scroll_bar.value() for scroll_bar in scroll_bars]
+        same_proof = title == self.preview_title and self.preview_frame.isVisible()
+
+        # so relative links work
+        browser.document().setBaseUrl(QtCore.QUrl.fromLocalFile(file_path))
+        # the scroll bars grow as the new version is laid out, in the background,
+        # so the scroll position is put back each time they change
+        self.preview_scroll_to = positions if same_proof else None
+        browser.setHtml(html_text)
+        self.restorePreviewScroll()
+
+        self.preview_path = file_path
+        self.preview_title = title
+        self.preview_label.setText(title)
+
+        if not self.preview_frame.isVisible():
+            # make room for it
+            width = self.width() + self.preview_frame.minimumWidth()
+            self.preview_frame.show()
+            self.resize(width, self.height())
+
+    def restorePreviewScroll(self):
+        if self.preview_scroll_to is None:
+            return
+        scroll_bars = (
+            self.preview_browser.horizontalScrollBar(),
+            self.preview_browser.verticalScrollBar(),
+        )
+        restored = True
+        for scroll_bar, position in zip(scroll_bars, self.preview_scroll_to):
+            scroll_bar.setValue(position)
+            restored = restored and scroll_bar.value() == position
+        if restored:
+            self.preview_scroll_to = None
+
+    def previewScrolled(self):
+        # the user has scrolled, stop putting back the old position
+        self.preview_scroll_to = None
+
+    def previewToggled(self, checked: bool):
+        if not checked and self.preview_frame.isVisible():
+            self.preview_frame.hide()
+
     def open_log(self):
         if platform.system() == "Darwin":  # macOS
             # a bit hacky, use subprocess instead?
@@ -227,7 +548,7 @@ class MainWindow(QtWidgets.QMainWindow, Ui_MainWindow):
             webbrowser.open(str(LOG_FILE_PATH))
 
 
-def run(chosen_date: date, word=False):
+def run(chosen_date: date, word=False, offline=False, sectioned=None):
 
     logger.info(f"{word=}")
 
@@ -248,76 +569,98 @@ def run(chosen_date: date, word=False):
         )
         return
 
-    mnis_data = json_from_uri(MNIS_ANSWERING_BODIES_URI)
+    mnis_data = referenceDataFromUri(MNIS_ANSWERING_BODIES_URI)
 
     if not mnis_data:
         warning("Error getting data from MNIS")
         return
 
-    html_template = buildUpHTML(eqm_data, mnis_data, chosen_date)
-
     if word is False:
         suffix = ".html"
     else:
-        suffix = ".doc"
-
-    # create new tempfile
-    tempfile, tempfilepath = mkstemp(suffix=suffix, prefix="QsTabled")
+        suffix = ".docx"
 
-    # output html to tempfile
-    with open(tempfile, "wb") as file:
-        html_template.write(
-            file, encoding="UTF-8", method="html", doctype="<!DOCTYPE html>"
+    # a proof made from the same data before is opened again rather than rewritten
+    try:
+        template_bytes, _ = readTemplate(templateFilePath())
+    except Exception:
+        # reported when the template is used
+        template_bytes = b""
+    # proofs made by another release of Fawcett are not reused either
+    digest = content_hash(
+        __version__.encode("utf-8"),
+        json.dumps(eqm_data, sort_keys=True).encode("utf-8"),
+        json.dumps(mnis_data, sort_keys=True).encode("utf-8"),
+        template_bytes,
+        b"offline" if offline else b"",
+        f"sections={sectioned}".encode("utf-8"),
+    )
+
+    def write_proof(file) -> bool:
+        # output html (or docx) to file
+        if word is False:
+            return streamHTML(
+                eqm_data, mnis_data, chosen_date, file, offline, sectioned
+            )
+        html_template = buildUpHTML(eqm_data, mnis_data, chosen_date)
+        if html_template is None:
+            return False
+        write_docx(html_template, file)
+        return True
+
+    proof_path = proof_store.get(PROOF_TYPE, chosen_date, digest, suffix)
+    if proof_path is not None:
+        logger.info(f"Reusing: {proof_path}")
+    else:
+        proof_path = proof_store.write(
+            PROOF_TYPE, chosen_date, digest, suffix, write_proof
         )
+        if proof_path is None:
+            # the problem has already been reported
+            return
+        logger.info(f"Created: {proof_path}")
 
-    logger.info(f"Created: {tempfilepath}")
+    tempfilepath = str(proof_path)
 
     if word is False:
-        # try to open in a web browser
+        # the proof was streamed to the file so a preview reads it from there
+        show_proof(
+            tempfilepath,
+            f"Questions tabled on {chosen_date:%d %B %Y}",
+            stylesheet=QUESTIONS_TABLED_CSS,
+        )
+    else:
+        logger.info("Trying to open the Word document...")
         try:
-            if os.name == "posix":
-                webbrowser.open("file://" + tempfilepath)
-            else:
-                webbrowser.open(tempfilepath)
+            open_document(tempfilepath)
         except Exception:
             warning(
-                f"The following HTML file was created:\n{tempfilepath}\n"
+                f"The following Word document was created:\n{tempfilepath}\n"
                 "but could not be opened automatically."
             )
-    else:
-        # output an HTML file but pretend it's a word file
-
-        logger.info("Trying to open in Word...")
-        open_Word(tempfilepath)
-        logger.info("Opened Word")
+        else:
+            logger.info("Opened the Word document")
 
 
-def open_Word(filepath):
+def open_document(filepath):
     """
-    Attempts to open filepath in Microsoft Word in the background
+    Open filepath with whatever application the system uses for that type of
+    file (Word, LibreOffice, etc.) without waiting for it to close.
     """
-    # print(str(filepath))
-    if OS_NAME == "nt":
-        # windows system
-        try:
-            thread = StartWordInBackground(filepath)
-            thread.daemon = True
-            thread.start()
-        except Exception:
-            # if there is any problem with the above just do a gineric `start` and hope for the best
-            os_system("start " + filepath)
+    if platform.system() == "Windows":
+        os.startfile(filepath)  # type: ignore
+    elif platform.system() == "Darwin":  # macOS
+        subprocess.Popen(["open", filepath])
     else:
-        # not a windows system
-        os_system("open " + filepath)  # `open` works on macOS, not sure about Linux
+        subprocess.Popen(["xdg-open", filepath])
 
 
 def json_from_uri(uri: str, showerror=True) -> Optional[Any]:
     headers = {"Content-Type": "application/json"}
-    request = urllib.request.Request(uri, headers=headers)
     try:
-        response = urllib.request.urlopen(request, context=CONTEXT, timeout=30)
-        json_obj = json.load(response)
-    except (HTTPError, URLError, timeout, JSONDecodeError) as e:
+        response = http_client.get(uri, headers=headers)
+        json_obj = response.json()
+    except (RequestException, ValueError) as e:
         if showerror:
             error(
                 f"Error getting data from:\n{uri}\n{e}\n\n"
@@ -328,132 +671,278 @@ def json_from_uri(uri: str, showerror=True) -> Optional[Any]:
         return json_obj
 
 
-def buildUpHTML(eqm_data, mnis_data, chosen_date: date):
+def referenceDataFromUri(uri: str) -> Optional[Any]:
+    """json_from_uri, reusing what was fetched in the last
+    REFERENCE_DATA_MAX_AGE seconds. The data returned must not be changed."""
+    fetched = _reference_data.get(uri)
+    if fetched is not None and time.monotonic() - fetched[0] < REFERENCE_DATA_MAX_AGE:
+        return fetched[1]
+    json_obj = json_from_uri(uri)
+    if json_obj:
+        _reference_data[uri] = (time.monotonic(), json_obj)
+    return json_obj
 
-    # list to be populated with answering bodies from MNIS
-    answers_dict: dict[str, str] = {}
 
-    # put mnis data in array
-    if mnis_data:
-        answering_bodies = mnis_data.get("AnsweringBodies", {}).get("AnsweringBody", [])
-        # build up a list of answering bodies
-        for answering_body in answering_bodies:
-            ab_name = answering_body.get("Name")
-            target = answering_body.get("Target")
-            answers_dict[ab_name] = target
+def renderQuestions(
+    question_blocks: list[QuestionBlock],
+    answers_dict: dict[str, str],
+    previous_date: Optional[date] = None,
+    highlighted: Optional[Iterator[HighlightFragment]] = None,
+) -> list[_Element]:
+    """
+    Headings and a paragraph for each question, for the questions div.
+    previous_date is the date of the block before these, if any.
+    highlighted, if given, has the highlighted text (see highlightFeed) for
+    these questions and those after them. Otherwise they are highlighted here.
+    """
 
-    # variables for totals info
-    ordinary_written: int = 0
-    name_day_written: int = 0
-    topical_questions: int = 0
-    substantive_Qs: int = 0
+    question_html_elements: list[_Element] = []
 
-    dateText = ""
+    # question text spans to be highlighted once all questions have been rendered
+    to_highlight: list[_Element] = []
+    highlight_jobs: list[HighlightJob] = []
 
-    question_html_elements: list[_Element] = []
+    block_date = previous_date
 
-    # loop through each question block
-    for question_block in eqm_data:
-        questionBlockDateText = question_block.get("Date")
-        # we don't wast today's date in the list
-        if questionBlockDateText != chosen_date:
-            if questionBlockDateText != dateText:
-                dateText = questionBlockDateText
-                _date = datetime.strptime(dateText, "%Y-%m-%d")
-                formattedDate = _date.strftime("%A %d %B %Y")
-
-                h3 = H3(f"Questions for Answer on {formattedDate}")
-
-                question_html_elements.append(h3)
-
-            question_html_elements.append(H4(question_block.get("Description", "")))
-
-            # loop through each question
-            questions = question_block.get("Questions", [])
-            for j, question in enumerate(questions):
-                qn_number = j + 1
-                # now look for Topical Questions and named days
-                question_type = question.get("Type")
-                topical = ""
-                name_day = ""
-
-                if question_type == "TOPICAL":
-                    topical = "T"
-                elif question_type == "NAMEDDAY":
-                    name_day = " N"
-
-                # variables for question data
-                memberText = question.get("Member")
-                constituencyText = question.get("Constituency")
-                qnText = question.get("Text")
-                uinText = question.get("UIN")
-                transferred = question.get("IsTransfer")
-                hasInterest = question.get("DeclaredInterest")
-                answering_body = question.get("AnsweringBody", "")
-
-                if transferred:
-                    transferred = "[Transferred] "
-                else:
-                    transferred = ""
-                if hasInterest != "":
-                    hasInterest = "[R] "
-                else:
-                    hasInterest = ""
-
-                # create a container para for the whole question
-                questions_item = P(
-                    CLASS("questionContainer"),
-                    SPAN(
-                        CLASS("questionNumber"), f"{topical}{qn_number}{name_day} "
-                    ),  # space at end for word version
-                    STRONG(CLASS("memberName"), f"{memberText} "),
-                    SPAN(CLASS("memberConstituency"), f"({constituencyText}): "),
+    for question_block in question_blocks:
+        if question_block.date != block_date:
+            block_date = question_block.date
+            formattedDate = block_date.strftime("%A %d %B %Y")
+
+            question_html_elements.append(
+                H3(f"Questions for Answer on {formattedDate}")
+            )
+
+        question_html_elements.append(H4(question_block.description))
+
+        for question in question_block.questions:
+            # create a container para for the whole question
+            questions_item = P(
+                CLASS("questionContainer"),
+                SPAN(
+                    CLASS("questionNumber"), f"{question.number_label} "
+                ),  # space at end for word version
+                STRONG(CLASS("memberName"), f"{question.member} "),
+                SPAN(CLASS("memberConstituency"), f"({question.constituency}): "),
+            )
+
+            qn_text_ele = SPAN(CLASS("questionText"))
+            qn_text_ele.text = question.text
+
+            if question.needs_highlighting:
+                to_highlight.append(qn_text_ele)
+                highlight_jobs.append(
+                    (question.text, question.answering_body, question.type)
                 )
 
-                qn_text_ele = SPAN(CLASS("questionText"))
-                # qn_text_ele.set('spellcheck', 'true')
-                # qn_text_ele.set('contenteditable', '')
-                qn_text_ele.text = qnText
+            uin_ele = SPAN(CLASS("uin"), question.uin_label)
 
-                if question_type != "TOPICAL" or j == 0:
+            questions_item.extend([qn_text_ele, uin_ele])
 
-                    qn_text_ele_copy = deepcopy(qn_text_ele)
+            # append the created question
+            question_html_elements.append(questions_item)
 
-                    try:
-                        addHighlights(
-                            qn_text_ele, answering_body, question_type, answers_dict
-                        )
-                        # questionText_span = addYellowHighlight(qnText, question_type, answers_dict)
-                        # questions_item.replace(old_questionText_span, questionText_span)
-                        # old_questionText_span.text = qnText
-                    except Exception as e:
-                        qn_text_ele = qn_text_ele_copy
-                        error(str(e))
-
-                uin_ele = SPAN(CLASS("uin"), f"{hasInterest}{transferred}({uinText})")
-
-                questions_item.extend([qn_text_ele, uin_ele])
-
-                # append the created question
-                question_html_elements.append(questions_item)
-
-                # Running totals of each question type
-                if question_type == "SUBSTANTIVE":
-                    substantive_Qs += 1
-                elif question_type == "TOPICAL":
-                    topical_questions += 1
-                elif question_type == "NAMEDDAY":
-                    name_day_written += 1
+    # swap in the highlighted question text. If highlighting failed the
+    # original text is left in place
+    if highlighted is None:
+        results = highlight_questions(highlight_jobs, answers_dict)
+    else:
+        results = [parse_fragment(next(highlighted)) for _ in highlight_jobs]
+    for qn_text_ele, (highlighted_ele, error_msg) in zip(to_highlight, results):
+        if highlighted_ele is None:
+            error(str(error_msg))
+        else:
+            qn_text_ele.getparent().replace(qn_text_ele, highlighted_ele)
+
+    return question_html_elements
+
+
+def buildUpHTML(eqm_data, mnis_data, chosen_date: date):
+
+    # answering bodies from MNIS
+    answers_dict = answering_body_targets(mnis_data)
+
+    question_blocks = decode_feed(eqm_data)
+
+    html_template = templateWithTotals(question_blocks, chosen_date)
+    if html_template is None:
+        return
+
+    # add all the questions and headings
+    questions_div = html_template.getroot().find(QUESTIONS_DIV_PATH)
+    questions_div.extend(renderQuestions(question_blocks, answers_dict))
+
+    return html_template
+
+
+def streamHTML(
+    eqm_data,
+    mnis_data,
+    chosen_date: date,
+    file,
+    offline=False,
+    sectioned: Optional[bool] = None,
+) -> bool:
+    """
+    Write the same HTML as buildUpHTML to file, but render and write out one
+    question block at a time rather than building the whole document first.
+    If offline is True the styles are put in the file (see offline_styles).
+    If sectioned is True each block is put in its own section, with a table
+    of contents before them (see sections). None does this for large proofs.
+    Returns False if there was a problem and nothing was written.
+    """
+
+    answers_dict = answering_body_targets(mnis_data)
+
+    question_blocks = decode_feed(eqm_data)
+
+    # the totals come before the questions so fill them in first
+    html_template = templateWithTotals(question_blocks, chosen_date)
+    if html_template is None:
+        return False
+
+    html_root = html_template.getroot()
+    questions_div = html_root.find(QUESTIONS_DIV_PATH)
+
+    number_of_questions = sum(len(block.questions) for block in question_blocks)
+    sectioned = use_sections(sectioned, number_of_questions)
+
+    extra_tags, extra_classes = QUESTION_TAGS, QUESTION_CLASSES
+    section_ids: List[str] = []
+    toc_groups: List[TocGroup] = []
+    if sectioned:
+        add_section_styles(html_root)
+        extra_tags += SECTION_TAGS
+        extra_classes += SECTION_CLASSES
+
+        # a section for each block, listed under its date in the contents
+        used_ids: Set[str] = set()
+        block_date = None
+        for question_block in question_blocks:
+            title = question_block.description
+            section_ids.append(
+                section_id(f"{question_block.date:%Y-%m-%d} {title}", used_ids)
+            )
+            if question_block.date != block_date:
+                block_date = question_block.date
+                toc_groups.append(
+                    (f"Questions for Answer on {block_date:%A %d %B %Y}", [])
+                )
+            toc_groups[-1][1].append((title, f"#{section_ids[-1]}"))
+
+    if offline:
+        inline_styles(html_root, QUESTIONS_TABLED_CSS, extra_tags, extra_classes)
+
+    # highlight the whole feed at once, so a large one can use a process pool
+    highlighted = highlightFeed(question_blocks, answers_dict)
+
+    # elements that must be left open while the questions are written
+    open_path = [questions_div, *questions_div.iterancestors()]
+
+    def write_element(hf, element: _Element):
+        with hf.element(element.tag, dict(element.attrib)):
+            if element.text:
+                hf.write(element.text)
+            for child in element:
+                if any(child is ancestor for ancestor in open_path):
+                    write_element(hf, child)
+                    if child.tail:
+                        hf.write(child.tail)
                 else:
-                    ordinary_written += 1
+                    hf.write(child)
+
+            if element is questions_div:
+                if sectioned:
+                    hf.write(toc_element(toc_groups))
+                previous_date: Optional[date] = None
+                for index, question_block in enumerate(question_blocks):
+                    question_elements = renderQuestions(
+                        [question_block], answers_dict, previous_date, highlighted
+                    )
+                    if sectioned:
+                        writeSection(hf, question_elements, section_ids[index])
+                    else:
+                        for question_element in question_elements:
+                            hf.write(question_element)
+                    previous_date = question_block.date
+                    hf.flush()
+
+    with htmlfile(file, encoding="UTF-8") as hf:
+        hf.write_doctype("<!DOCTYPE html>")
+        write_element(hf, html_root)
+
+    return True
+
+
+def highlightFeed(
+    question_blocks: list[QuestionBlock], answers_dict: dict[str, str]
+) -> Iterator[HighlightFragment]:
+    """The highlighted text, as HTML, of every question that needs it, in order.
+
+    Questions are highlighted a chunk at a time as the fragments are used.
+    """
 
-    # read the HTML template
+    def questions_to_highlight() -> Iterator[Question]:
+        for question_block in question_blocks:
+            for question in question_block.questions:
+                if question.needs_highlighting:
+                    yield question
+
+    number_of_jobs = sum(1 for _ in questions_to_highlight())
+    highlight_jobs: Iterator[HighlightJob] = (
+        (question.text, question.answering_body, question.type)
+        for question in questions_to_highlight()
+    )
+    return highlight_fragments(highlight_jobs, number_of_jobs, answers_dict)
+
+
+def writeSection(hf, question_elements: List[_Element], element_id: str):
+    """Write the elements for a question block in a section."""
+    # the date heading, if any, is for this block and the ones after it
+    if question_elements and question_elements[0].tag == "h3":
+        hf.write(question_elements.pop(0))
+    with hf.element("section", {"class": SECTION_CLASS, "id": element_id}):
+        for question_element in question_elements:
+            hf.write(question_element)
+
+
+def templateFilePath() -> Path:
     html_template_file_Path = Path(__file__).with_name("FawcettApp_template.html")
     if hasattr(sys, "executable") and hasattr(sys, "_MEIPASS"):
         # only here if using the bundled version
         html_template_file_Path = Path(sys.executable).with_name(
             "FawcettApp_template.html"
         )
+    return html_template_file_Path
+
+
+def readTemplate(template_path: Path) -> Tuple[bytes, Any]:
+    """The bytes and the parsed tree of the HTML template.
+
+    Both are kept until the file changes. The tree is shared, so copy it
+    before changing it.
+    """
+    modified = template_path.stat().st_mtime
+    template = _templates.get(template_path)
+    if template is None or template[0] != modified:
+        template_bytes = template_path.read_bytes()
+        tree = html.parse(BytesIO(template_bytes), base_url=str(template_path))
+        template = _templates[template_path] = (modified, template_bytes, tree)
+    return template[1], template[2]
+
+
+def templateWithTotals(question_blocks: list[QuestionBlock], chosen_date: date):
+    """Read the HTML template and fill in the title and the totals table."""
+
+    # variables for totals info
+    counts = count_questions(question_blocks)
+    ordinary_written = counts[ORDINARY]
+    name_day_written = counts[NAMEDDAY]
+    topical_questions = counts[TOPICAL]
+    substantive_Qs = counts[SUBSTANTIVE]
+
+    # read the HTML template
+    html_template_file_Path = templateFilePath()
     try:
         html_template_file_Path = html_template_file_Path.absolute().resolve(
             strict=True
@@ -468,7 +957,7 @@ def buildUpHTML(eqm_data, mnis_data, chosen_date: date):
 
     logger.info(f"Attempting to read: {html_template_file_Path}")
     try:
-        html_template = html.parse(str(html_template_file_Path))
+        html_template = copy.deepcopy(readTemplate(html_template_file_Path)[1])
     except Exception as e:
         error(
             "An error occurred while trying to read the following file\n"
@@ -479,7 +968,7 @@ def buildUpHTML(eqm_data, mnis_data, chosen_date: date):
     html_root = html_template.getroot()
 
     # get the questions div
-    questions_div = html_root.find('body//div[@class="questions"]')
+    questions_div = html_root.find(QUESTIONS_DIV_PATH)
     if not iselement(questions_div):
         error(
             "The template HTML file is missing the following required element:\n"
@@ -488,9 +977,6 @@ def buildUpHTML(eqm_data, mnis_data, chosen_date: date):
         )
         return
 
-    # add all the questions and headings
-    questions_div.extend(question_html_elements)
-
     total_writtens = ordinary_written + name_day_written
     total_orals = substantive_Qs + topical_questions
     grand_total = total_writtens + total_orals
@@ -523,140 +1009,7 @@ def buildUpHTML(eqm_data, mnis_data, chosen_date: date):
     return html_template
 
 
-def addHighlights(
-    qn_ele: _Element,
-    q_answering_body: str,
-    question_type: str,
-    answers_dict: dict[str, str],
-) -> None:
-
-    # HIGHLIGHT IN YELLOW
-    # 1. any repetitions of the initial text of the question marked up e.g.
-    # ‘To ask The Chancellor of the Exchequer, To ask The Chancellor of the Exchequer’
-    # 2. any instances where the initial word after the first comma is upper cased
-    # (it should be lower cased) e.g. ‘To ask The Chancellor of the Exchequer, How many’
-    # 3. any absences of the initial text marked up e.g. missing
-    # ‘To ask The Chancellor of the Exchequer’
-    # 4. any absences of the initial comma marked up e.g.
-    # ‘To ask The Chancellor of the Exchequer how many’
-
-    # HIGHLIGHT IN PINK
-    # where To ask The... does not match the answering body
-
-    # sometimes the answering_body does not match the to ask the text
-    # here is what paul had to say about it:
-    # - occasionally we change the department a question is directed to but forget to change the title in the question or vice versa
-    # The heading does not show up in the app but I wonder whether the intro ‘To ask the ….’ could get highlighted (in a different colour to yellow) if it does not correspond with the department it has been allocated to.
-
-    if not qn_ele.text:
-        # we   wont do anything if there is no text
-        return
-
-    qn_text = qn_ele.text
-    # delete the text
-    qn_ele.text = ""
-
-    # This will only work on written questions
-    if question_type != "NAMEDDAY" and question_type != "ORDINARY":
-        return
-
-    '<span class="marker" data-toggle="tooltip" title="More than one space">&#160;&#160;</span>'
-
-    marker_tamplate = '<span class="marker">{text}</span>'
-    marker_with_pop_template = '<span class="marker" data-toggle="tooltip" title="{tool_tip_title}">{text}</span>'
-    pink_maker_template = '<span class="marker-pink" data-toggle="tooltip" title="{tool_tip_title}">{text}</span>'
-
-    strings = []
-
-    target_not_found = False
-
-    # pink heighlight first
-    expected_target = answers_dict.get(q_answering_body, "")
-    to_ask = f"To ask {expected_target}"
-    if expected_target and qn_text.startswith(to_ask):
-        strings.append(to_ask)
-
-        # remove this now
-        qn_text = re.sub(f"^{to_ask}", "", qn_text)
-    else:
-        # not proper so we'll highlight in pink
-        # search for the (wrong) target used
-        for target in answers_dict.values():
-            to_ask = f"To ask {target}"
-            if qn_text.startswith(to_ask):
-                qn_text = re.sub(f"^{to_ask}", "", qn_text)
-
-                pink_marker = pink_maker_template.format(
-                    tool_tip_title=f"Expected {expected_target}", text=to_ask
-                )
-
-                strings.append(pink_marker)
-
-                break
-        else:  # loop exited normally i.e. didn't break
-            # we need to add something here as the question doesn't
-            # start with a target
-            target_not_found = True
-            if len(qn_text) > 6:
-                first_chars = qn_text[0:6]
-                qn_text = qn_text[6:]
-            else:
-                first_chars = qn_text[0]
-                qn_text = qn_text[1:]
-            pink_marker = pink_maker_template.format(
-                tool_tip_title=f"Expected {expected_target}", text=first_chars
-            )
-
-            strings.append(pink_marker)
-
-    if qn_text:  # if there is any qn txt left
-
-        # match_obj = re.search(r'^, ?[A-Z0-9]', qn_text)
-        match_obj = re.search(r"^,", qn_text)
-        if not match_obj and not target_not_found:
-            first_char = qn_text[0]
-            qn_text = qn_text[1:]
-
-            yellow_marker = marker_with_pop_template.format(
-                tool_tip_title="Expected comma", text=first_char
-            )
-
-            strings.append(yellow_marker)
-
-    if qn_text:
-        # now do several replaces.
-        # pattern = re.compile( )
-        srf = "suggested redraft"
-        spaces = r"\s\s+"
-        splits = re.split(f"({srf}|{spaces})", qn_text, re.IGNORECASE)
-
-        for string in splits:
-            if re.fullmatch(srf, string, re.IGNORECASE):
-                marker = marker_tamplate.format(text=string.upper())
-                strings.append(marker)
-            elif re.fullmatch(spaces, string):
-                marker = marker_with_pop_template.format(
-                    text="&nbsp;&nbsp;", tool_tip_title="More than one space"
-                )
-                strings.append(marker)
-            else:
-                strings.append(string)
-
-    # join the strings
-    q_inner = "".join(strings)
-
-    if q_inner[-1] != ".":
-        marker = marker_with_pop_template.format(
-            text=q_inner[-1], tool_tip_title="Expected full stop"
-        )
-        q_inner = q_inner[:-1] + marker
-
-    temp_element = html.fromstring(f'<span class="temporary">{q_inner}</span>')
-
-    qn_ele.append(temp_element)
-    # print(html.tostring(qn_ele))
-    temp_element.drop_tag()
-
-
 if __name__ == "__main__":
+    # needed for the highlighting process pool in the bundled .exe
+    multiprocessing.freeze_support()
     main()
@@ -138,6 +138,24 @@ class Ui_MainWindow(object):
         self.formLayout_2.setWidget(
             3, QtWidgets.QFormLayout.SpanningRole, self.checkBox_3_OP
         )
+        self.sections_checkbox_OP = QtWidgets.QCheckBox(self.frame_3)
+        self.sections_checkbox_OP.setObjectName("sections_checkbox_OP")
+        self.formLayout_2.setWidget(
+            4, QtWidgets.QFormLayout.SpanningRole, self.sections_checkbox_OP
+        )
+        self.page_size_label_OP = QtWidgets.QLabel(self.frame_3)
+        self.page_size_label_OP.setWordWrap(True)
+        self.page_size_label_OP.setObjectName("page_size_label_OP")
+        self.formLayout_2.setWidget(
+            5, QtWidgets.QFormLayout.LabelRole, self.page_size_label_OP
+        )
+        self.page_size_spinBox_OP = QtWidgets.QSpinBox(self.frame_3)
+        self.page_size_spinBox_OP.setMaximumSize(QtCore.QSize(200, 16777215))
+        self.page_size_spinBox_OP.setMaximum(999)
+        self.page_size_spinBox_OP.setObjectName("page_size_spinBox_OP")
+        self.formLayout_2.setWidget(
+            5, QtWidgets.QFormLayout.FieldRole, self.page_size_spinBox_OP
+        )
         self.verticalLayout.addWidget(self.frame_3)
         self.frame_4 = QtWidgets.QFrame(self.tab_2)
         self.frame_4.setFrameShape(QtWidgets.QFrame.NoFrame)
@@ -167,6 +185,10 @@ class Ui_MainWindow(object):
         self.frame_5.setObjectName("frame_5")
         self.horizontalLayout_2 = QtWidgets.QHBoxLayout(self.frame_5)
         self.horizontalLayout_2.setObjectName("horizontalLayout_2")
+        self.preview_checkbox = QtWidgets.QCheckBox(self.frame_5)
+        self.preview_checkbox.setChecked(True)
+        self.preview_checkbox.setObjectName("preview_checkbox")
+        self.horizontalLayout_2.addWidget(self.preview_checkbox)
         spacerItem2 = QtWidgets.QSpacerItem(
             40, 20, QtWidgets.QSizePolicy.Expanding, QtWidgets.QSizePolicy.Minimum
         )
@@ -176,6 +198,31 @@ class Ui_MainWindow(object):
         self.logBtn.setObjectName("logBtn")
         self.horizontalLayout_2.addWidget(self.logBtn)
         self.gridLayout.addWidget(self.frame_5, 2, 0, 1, 1)
+        self.preview_frame = QtWidgets.QFrame(self.centralwidget)
+        self.preview_frame.setMinimumSize(QtCore.QSize(600, 0))
+        self.preview_frame.setFrameShape(QtWidgets.QFrame.NoFrame)
+        self.preview_frame.setObjectName("preview_frame")
+        self.preview_layout = QtWidgets.QVBoxLayout(self.preview_frame)
+        self.preview_layout.setObjectName("preview_layout")
+        self.preview_browser = QtWidgets.QTextBrowser(self.preview_frame)
+        self.preview_browser.setOpenExternalLinks(True)
+        self.preview_browser.setObjectName("preview_browser")
+        self.preview_layout.addWidget(self.preview_browser)
+        self.preview_buttons_layout = QtWidgets.QHBoxLayout()
+        self.preview_buttons_layout.setObjectName("preview_buttons_layout")
+        self.preview_label = QtWidgets.QLabel(self.preview_frame)
+        self.preview_label.setText("")
+        self.preview_label.setObjectName("preview_label")
+        self.preview_buttons_layout.addWidget(self.preview_label)
+        spacerItem3 = QtWidgets.QSpacerItem(
+            40, 20, QtWidgets.QSizePolicy.Expanding, QtWidgets.QSizePolicy.Minimum
+        )
+        self.preview_buttons_layout.addItem(spacerItem3)
+        self.open_in_browser_btn = QtWidgets.QPushButton(self.preview_frame)
+        self.open_in_browser_btn.setObjectName("open_in_browser_btn")
+        self.preview_buttons_layout.addWidget(self.open_in_browser_btn)
+        self.preview_layout.addLayout(self.preview_buttons_layout)
+        self.gridLayout.addWidget(self.preview_frame, 0, 1, 5, 1)
         MainWindow.setCentralWidget(self.centralwidget)
         self.actionInstilation_Instructions = QtWidgets.QAction(MainWindow)
         self.actionInstilation_Instructions.setObjectName(
@@ -230,11 +277,40 @@ class Ui_MainWindow(object):
         self.checkBox_1_OP.setText(_translate("MainWindow", "Effectives"))
         self.checkBox_2_OP.setText(_translate("MainWindow", "Announcements"))
         self.checkBox_3_OP.setText(_translate("MainWindow", "Future Business A"))
+        self.sections_checkbox_OP.setToolTip(
+            _translate(
+                "MainWindow",
+                "Put each part (e.g. each day of Future Business) in its own section, with a table of contents, even if the proof is not large",
+            )
+        )
+        self.sections_checkbox_OP.setText(
+            _translate("MainWindow", "Sections and contents")
+        )
+        self.page_size_label_OP.setText(_translate("MainWindow", "Sections per page"))
+        self.page_size_spinBox_OP.setToolTip(
+            _translate(
+                "MainWindow",
+                "Split the sections across linked pages of this many sections",
+            )
+        )
+        self.page_size_spinBox_OP.setSpecialValueText(
+            _translate("MainWindow", "All on one page")
+        )
         self.create_proof_btn_OP.setText(_translate("MainWindow", "Create Quick Proof"))
         self.tabWidget.setTabText(
             self.tabWidget.indexOf(self.tab_2), _translate("MainWindow", "Order Paper")
         )
+        self.preview_checkbox.setToolTip(
+            _translate(
+                "MainWindow",
+                "Show browser proofs here, updated in place, instead of in a new browser tab",
+            )
+        )
+        self.preview_checkbox.setText(
+            _translate("MainWindow", "Preview in this window")
+        )
         self.logBtn.setText(_translate("MainWindow", "Open Log"))
+        self.open_in_browser_btn.setText(_translate("MainWindow", "Open in Browser"))
         self.actionInstilation_Instructions.setText(
             _translate("MainWindow", "Instilation Instructions")
         )
@@ -4,9 +4,12 @@
 import sys
 
 # stuff needed for working with file paths
+import os
 from os import path
 import datetime
 
+from typing import List, NamedTuple, Tuple
+
 # stuff needed for parsing and manipulating XML
 # This moduel does not come with python and needs to be installed with pip e.g. pip install lxml
 from lxml import etree
@@ -15,156 +18,79 @@ from lxml import etree
 file_name_start = "for_InDesign_Qs"
 fileextension = ".xml"
 
+# streamed output is written to a file with this suffix and renamed when done
+PART_SUFFIX = ".part"
+
+
+class TransformWarning(NamedTuple):
+    """A problem found while transforming, reported instead of stopping."""
+
+    code: str
+    message: str
+
+
+def format_sitting_date(sitting_date) -> str:
+    """Return the sitting date in the form used in PMQs e.g. Tuesday 20 October"""
+    if not sitting_date:
+        return ""
+    try:
+        sitting_date_obj = datetime.datetime.strptime(sitting_date, "%Y-%m-%d")
+    except (ValueError, TypeError):
+        return ""
+    return sitting_date_obj.strftime("%A %d %B")
+
+
+def transform_tree(
+    source, sitting_date=None
+) -> Tuple[etree._Element, List[TransformWarning]]:
+    """Transform EQM OrderPaper.xml into XML for InDesign, in memory.
+
+    source can be anything etree.parse accepts (a path or a file like
+    object) or an already parsed element. Returns the output root element
+    and a list of warnings. Nothing is written to disk, nothing is printed
+    and the process is never exited, so this is safe to use from the GUI or
+    from worker pools.
+    """
+    warnings: List[TransformWarning] = []
+    date_formatted = format_sitting_date(sitting_date)
 
-def transform_xml(inputfile, output_folder=None, sitting_date=None):
-    # convert the sitting_date str into a datatime.date
-    if sitting_date:
-        try:
-            sitting_date_obj = datetime.datetime.strptime(sitting_date, "%Y-%m-%d")
-            date_formatted = sitting_date_obj.strftime("%A %d %B")
-            print(date_formatted)
-        except (ValueError, TypeError):
-            date_formatted = ""
-    # parse and build up a tree for the input file
-    input_root = etree.parse(inputfile).getroot()  # LXML element object for the root
     # create an output root element
     output_root = etree.Element("root")
 
-    # get all the TargetGroup elements as an iterable
-    target_groups = input_root.xpath("//TargetGroup")
-
-    for target_group in target_groups:
-        # find the target head for each group
-        target_head = target_group.find("TargetHead")
-        # add timeing info to the output if exits in the input
-        if len(target_group.xpath("./Time")) != 0:
-            times_ele = etree.SubElement(output_root, "Times")
-            times_ele.text = "At {}".format(
-                target_group.findtext("Time", default="")
-                .replace(" ", "")
-                .replace(":", ".")
-                .replace("12.00pm", "12 noon")
+    if etree.iselement(source):
+        input_root = source
+    else:
+        try:
+            # parse and build up a tree for the input file
+            input_root = etree.parse(source).getroot()
+        except etree.XMLSyntaxError as e:
+            warnings.append(
+                TransformWarning("invalid-xml", f"Could not parse questions XML: {e}")
             )
-        # create an element for the bulleted questions title
-        bullet_tag = etree.SubElement(output_root, "Bulleted")
+            return output_root, warnings
 
-        # find all the questions in this target group and store them in a list
-        questions = target_group.findall("OralQn")
-        # default question tag
-        Question_tag_name = "Question"
-        # default question number prefix
-        number_prefix = ""
-        # ordinary oral questions
-        if (
-            target_head.get("IsTopical") == "N"
-            and target_head.text != "the Prime Minister"
-        ):
-            bullet_tag.text = "Oral Questions to " + target_head.text
-            Question_tag_name = "Question"
-            number_prefix = ""
-
-        # topical questions
-        elif target_head.get("IsTopical") == "Y":
-            # add the questions to bullet point
-            bullet_tag.text = "Topical Questions to " + target_head.text
-            Question_tag_name = "TopicalQuestion"
-            number_prefix = "T"
-
-        # Prime Ministers Questions
-        elif (
-            target_head.get("IsTopical") == "N"
-            and target_head.text == "the Prime Minister"
-        ):
-            # add the questions to bullet point
-            bullet_tag.text = "Oral Questions to the Prime Minister"
-            Question_tag_name = "PMQ"
-            number_prefix = "Q"
+    # get all the TargetGroup elements as an iterable
+    for target_group in input_root.iter("TargetGroup"):
+        transform_target_group(target_group, output_root, date_formatted, warnings)
 
-        else:
-            print(
-                "Error: check the input file contains TargetHead elements and that these "
-                'elements all have the attribute "IsTopical" and that the value of the '
-                'IsTopical attribute is either an "Y" or an "N" and if there are PMQs that '
-                'the text of the TargetHead element is "the Prime Minister".'
-            )
-            exit()
-        # engagements text printed
-        engagements_printed = False
-        # for i in range(len(questions)):
-        for i, question in enumerate(questions):
-            # make sure questions start at 1
-            if i == 0:
-                if Question_tag_name != "PMQ":
-                    restart = "Restart"
-            else:
-                restart = ""
-            # create different Question parent element depending on type of q
-            Question_Element = etree.SubElement(
-                output_root, Question_tag_name + restart
-            )
-            # create child elements needed
-            Member_Element = etree.SubElement(Question_Element, "Member")
-            Constituency_Element = etree.SubElement(Question_Element, "Constit")
-            qn_text_Element = etree.SubElement(Question_Element, "QnText")
-            uin_Element = etree.SubElement(Question_Element, "UIN")
-
-            # put in the question number in an attribute. This is not necessary for InDesign.
-            Question_Element.set("number", number_prefix + str(i + 1))
-            # build up member name element from constituent parts
-            member_Title_text = question.findtext("Member/Title", default="").strip()
-            member_Fnames_text = question.findtext("Member/Fnames", default="").strip()
-            member_Sname_text = question.findtext("Member/Sname", default="").strip()
-            Member_Element.text = "{} {} {}".format(
-                member_Title_text, member_Fnames_text, member_Sname_text
-            ).strip()  # strip start space if no title
-
-            # has the question got an associated relevant interest
-
-            relevant_interest = question.find("QnRubric").get("RID", default="")
-            # if the RID attribute is anything other than 'N' - assume there is an interest
-            if relevant_interest != "N":
-                relevant_interest = "[R] "
-            else:
-                relevant_interest = ""
-
-            # constituency element and UIN
-            Constituency_Element.text = " ({})".format(
-                question.findtext("Member/Constit", default="").strip()
-            )
-            uin_Element.text = " {}({})".format(
-                relevant_interest, question.findtext("UIN", default="").strip()
-            )
-            # get the QnText element from the input question
-            qn_text = question.find("QnText")
-
-            Constituency_Element.tail = "\u2028"
-            qn_text_Element.text = qn_text.text.strip()
-            if (
-                engagements_printed is False
-                and qn_text.text
-                and qn_text.text.strip().lower()
-                in (
-                    f"If she will list her official engagements for {date_formatted}.".lower(),
-                    f"If he will list his official engagements for {date_formatted}.".lower(),
-                )
-            ):
-                # When doing PMQs, the text `If she/he will list his/her official engagements for [date]`
-                # must appear exactly once. Unfortunately, if the first question is substantive (i.e. something other
-                # then the engagements text) then the XML (from the API) will be wrong. The first instance fo the
-                # engagements text should always have the PrintText attribute set to `Y` but unfortunately it doesn't.
-                # We will get round that here.
-                engagements_printed = True
-            elif qn_text.get("PrintText") != "Y":
-                Constituency_Element.tail = None
-                qn_text_Element.text = None
-
-    # loop through each top level element in output_root and a new line to tail
-    # this is to allow InDesign to put new paragraphs in
-    for element in output_root:
-        if element.tail is not None:
-            element.tail += "\n"
-        else:
-            element.tail = "\n"
+    return output_root, warnings
+
+
+def print_warnings(warnings: List[TransformWarning]):
+    for warning in warnings:
+        print(f"Error: {warning.message}")
+
+
+def transform_xml(inputfile, output_folder=None, sitting_date=None, streaming=False):
+    """Transform the EQM OrderPaper.xml in inputfile and write the result to disk.
+
+    If streaming is True the input is read with iterparse one TargetGroup at
+    a time and the output for each group is written out as soon as it is
+    made, so memory use does not grow with the number of questions.
+    """
+    date_formatted = format_sitting_date(sitting_date)
+    if date_formatted:
+        print(date_formatted)
 
     # output the XML
     if output_folder is None:
@@ -175,28 +101,250 @@ def transform_xml(inputfile, output_folder=None, sitting_date=None):
     else:
         filename = "{}{}".format(file_name_start, fileextension)
     filepath = path.join(output_folder, filename)
+
+    if streaming:
+        stream_transform(inputfile, filepath, filename, date_formatted)
+        return
+
+    output_root, warnings = transform_tree(inputfile, sitting_date)
+    print_warnings(warnings)
+
     # write out the file
     et = etree.ElementTree(output_root)
     try:
         et.write(filepath)  # , pretty_print=True
         print("\nOutput, transformed XML is located at: \n", filepath)
-    except:
+    except OSError:
         # make sure it works even if we don't have permission to modify the file
         et.write(filename)
         print("\nOutput, transformed XML is located at: \n", path.abspath(filename))
 
 
+def stream_transform(
+    inputfile, filepath, filename, date_formatted
+) -> List[TransformWarning]:
+    """Transform inputfile one TargetGroup at a time, writing as we go.
+
+    The output is written to a temporary file that only replaces filepath
+    once all the input has been read. If the input is not valid XML an
+    "invalid-xml" warning is returned and filepath is left as it was.
+    """
+    try:
+        output_file = open(filepath + PART_SUFFIX, "wb")
+    except OSError:
+        # make sure it works even if we don't have permission to modify the file
+        filepath = path.abspath(filename)
+        output_file = open(filepath + PART_SUFFIX, "wb")
+
+    warnings: List[TransformWarning] = []
+    try:
+        with output_file, etree.xmlfile(output_file, encoding="ASCII") as xf:
+            with xf.element("root"):
+                for _, target_group in etree.iterparse(inputfile, tag="TargetGroup"):
+                    group_root = etree.Element("root")
+                    transform_target_group(
+                        target_group, group_root, date_formatted, warnings
+                    )
+                    for element in group_root:
+                        xf.write(element)
+
+                    # free the input we have finished with
+                    target_group.clear()
+                    while target_group.getprevious() is not None:
+                        del target_group.getparent()[0]
+
+        os.replace(filepath + PART_SUFFIX, filepath)
+    except etree.XMLSyntaxError as e:
+        warnings.append(
+            TransformWarning("invalid-xml", f"Could not parse questions XML: {e}")
+        )
+        os.remove(filepath + PART_SUFFIX)
+        print_warnings(warnings)
+        print("\nNo output has been written.")
+        return warnings
+
+    print_warnings(warnings)
+    print("\nOutput, transformed XML is located at: \n", filepath)
+    return warnings
+
+
+def transform_target_group(target_group, output_root, date_formatted, warnings):
+    """Append the InDesign elements for one TargetGroup to output_root.
+
+    If the group can not be transformed a TransformWarning is appended to
+    warnings and the group is left out.
+    """
+    # index of the first element added for this group
+    first_added = len(output_root)
+
+    # find the target head for each group
+    target_head = target_group.find("TargetHead")
+    if target_head is None:
+        target_head = etree.Element("TargetHead")
+    is_topical = target_head.get("IsTopical")
+
+    # ordinary oral questions
+    if is_topical == "N" and target_head.text != "the Prime Minister":
+        bullet_text = "Oral Questions to " + (target_head.text or "")
+        Question_tag_name = "Question"
+        number_prefix = ""
+
+    # topical questions
+    elif is_topical == "Y":
+        # add the questions to bullet point
+        bullet_text = "Topical Questions to " + (target_head.text or "")
+        Question_tag_name = "TopicalQuestion"
+        number_prefix = "T"
+
+    # Prime Ministers Questions
+    elif is_topical == "N" and target_head.text == "the Prime Minister":
+        # add the questions to bullet point
+        bullet_text = "Oral Questions to the Prime Minister"
+        Question_tag_name = "PMQ"
+        number_prefix = "Q"
+
+    else:
+        warnings.append(
+            TransformWarning(
+                "unexpected-target-head",
+                "check the input file contains TargetHead elements and that these "
+                'elements all have the attribute "IsTopical" and that the value of the '
+                'IsTopical attribute is either an "Y" or an "N" and if there are PMQs '
+                'that the text of the TargetHead element is "the Prime Minister". '
+                f"The questions to {target_head.text} (IsTopical={is_topical}) "
+                "have been left out.",
+            )
+        )
+        return
+
+    # add timeing info to the output if exits in the input
+    time_text = target_group.findtext("Time")
+    if time_text is not None:
+        times_ele = etree.SubElement(output_root, "Times")
+        times_ele.text = "At {}".format(
+            time_text.replace(" ", "").replace(":", ".").replace("12.00pm", "12 noon")
+        )
+    # create an element for the bulleted questions title
+    etree.SubElement(output_root, "Bulleted").text = bullet_text
+
+    # find all the questions in this target group and store them in a list
+    questions = target_group.findall("OralQn")
+    # engagements text printed
+    engagements_printed = False
+    # for i in range(len(questions)):
+    for i, question in enumerate(questions):
+        # make sure questions start at 1
+        restart = ""
+        if i == 0 and Question_tag_name != "PMQ":
+            restart = "Restart"
+        # create different Question parent element depending on type of q
+        Question_Element = etree.SubElement(output_root, Question_tag_name + restart)
+        # create child elements needed
+        Member_Element = etree.SubElement(Question_Element, "Member")
+        Constituency_Element = etree.SubElement(Question_Element, "Constit")
+        qn_text_Element = etree.SubElement(Question_Element, "QnText")
+        uin_Element = etree.SubElement(Question_Element, "UIN")
+
+        # put in the question number in an attribute. This is not necessary for InDesign.
+        Question_Element.set("number", number_prefix + str(i + 1))
+        # build up member name element from constituent parts
+        member = question.find("Member")
+        if member is None:
+            member = etree.Element("Member")
+        member_Title_text = member.findtext("Title", default="").strip()
+        member_Fnames_text = member.findtext("Fnames", default="").strip()
+        member_Sname_text = member.findtext("Sname", default="").strip()
+        Member_Element.text = "{} {} {}".format(
+            member_Title_text, member_Fnames_text, member_Sname_text
+        ).strip()  # strip start space if no title
+
+        uin_text = question.findtext("UIN", default="").strip()
+
+        # has the question got an associated relevant interest
+        qn_rubric = question.find("QnRubric")
+        if qn_rubric is None:
+            warnings.append(
+                TransformWarning(
+                    "missing-rubric",
+                    f"The question from {Member_Element.text} ({uin_text}) has no "
+                    "QnRubric element so it has been marked as having a relevant "
+                    "interest.",
+                )
+            )
+            relevant_interest = ""
+        else:
+            relevant_interest = qn_rubric.get("RID", default="")
+        # if the RID attribute is anything other than 'N' - assume there is an interest
+        if relevant_interest != "N":
+            relevant_interest = "[R] "
+        else:
+            relevant_interest = ""
+
+        # constituency element and UIN
+        Constituency_Element.text = " ({})".format(
+            member.findtext("Constit", default="").strip()
+        )
+        uin_Element.text = " {}({})".format(relevant_interest, uin_text)
+        # get the QnText element from the input question
+        qn_text = question.find("QnText")
+        qn_text_text = question.findtext("QnText", default="").strip()
+
+        if qn_text is None or (not qn_text_text and qn_text.get("PrintText") == "Y"):
+            warnings.append(
+                TransformWarning(
+                    "missing-question-text",
+                    f"The question from {Member_Element.text} ({uin_text}) has no "
+                    "text.",
+                )
+            )
+
+        Constituency_Element.tail = "\u2028"
+        qn_text_Element.text = qn_text_text
+        if (
+            engagements_printed is False
+            and qn_text_text
+            and qn_text_text.lower()
+            in (
+                f"If she will list her official engagements for {date_formatted}.".lower(),
+                f"If he will list his official engagements for {date_formatted}.".lower(),
+            )
+        ):
+            # When doing PMQs, the text `If she/he will list his/her official engagements for [date]`
+            # must appear exactly once. Unfortunately, if the first question is substantive (i.e. something other
+            # then the engagements text) then the XML (from the API) will be wrong. The first instance fo the
+            # engagements text should always have the PrintText attribute set to `Y` but unfortunately it doesn't.
+            # We will get round that here.
+            engagements_printed = True
+        elif qn_text is None or qn_text.get("PrintText") != "Y":
+            Constituency_Element.tail = None
+            qn_text_Element.text = None
+
+    # give each top level element a new line in its tail
+    # this is to allow InDesign to put new paragraphs in
+    for element in output_root[first_added:]:
+        if element.tail is not None:
+            element.tail += "\n"
+        else:
+            element.tail = "\n"
+
+
 def main():
-    if len(sys.argv) != 2:
+    # --streaming can be given anywhere
+    arguments = [argument for argument in sys.argv[1:] if argument != "--streaming"]
+    streaming = len(arguments) != len(sys.argv) - 1
+
+    if len(arguments) != 1:
         print(
             "\nThis script takes 1 argument.\n",
             "1:\tthe path to the file you wish to process.\n",
+            "Add --streaming to read and write one TargetGroup at a time "
+            "(for very large files).\n",
         )
         exit()
 
-    infilename = sys.argv[1]
+    infilename = arguments[0]
     print("Input file is located at: " + path.abspath(infilename))
-    transform_xml(infilename)
+    transform_xml(infilename, streaming=streaming)
     print("\nAll Done Chum!")
 
 
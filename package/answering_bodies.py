@@ -0,0 +1,298 @@
+"""
+Answering bodies (government departments etc.) as listed by MNIS.
+
+These give the headings, and their order, for the Written Statements section
+of the Order Paper. The AnsweringBodies response from MNIS is saved to disk
+and the section is built from that saved snapshot, so MNIS is not asked on
+every run. The snapshot is only fetched again when it is missing or older
+than SNAPSHOT_MAX_AGE, or when this module is run as a script. The sort
+order worked out from the snapshot is cached next to it, keyed by a hash of
+the snapshot (and of the override file), so it is only rebuilt when one of
+them changes. So is the table of headings and sort ranks for each name.
+
+To change the order without a code release, list headings one per line, in
+the order they should appear, in the override file (OVERRIDE_PATH). Headings
+not listed there follow in alphabetical order.
+"""
+
+# standard library imports
+import hashlib
+import json
+import logging
+import os
+from pathlib import Path
+import sys
+import time
+from typing import Dict, List, Optional, Tuple
+
+# 3rd party imports
+from lxml import etree
+import requests
+
+try:
+    import http_client
+except ImportError:
+    import package.http_client as http_client
+
+
+MNIS_ANSWERING_BODIES_URL = "http://data.parliament.uk/membersdataplatform/services/mnis/ReferenceData/AnsweringBodies/"
+
+CACHE_DIR = Path(os.environ.get("FAWCETT_CACHE_DIR", Path.home() / ".fawcett"))
+SNAPSHOT_PATH = CACHE_DIR / "mnis-answering-bodies.xml"
+SORT_ORDER_PATH = CACHE_DIR / "ws-sort-order.json"
+OVERRIDE_PATH = CACHE_DIR / "ws-sort-order-override.txt"
+
+# seconds before the saved snapshot is fetched again
+SNAPSHOT_MAX_AGE = 7 * 24 * 60 * 60
+
+logger = logging.getLogger("fawcett_app.answering_bodies")
+
+# only used until a MNIS snapshot has been saved
+FALLBACK_SORT_ORDER = [
+    "Attorney General",
+    "Secretary of State for Business, Energy and Industrial Strategy",
+    "Minister for the Cabinet Office",
+    "The Chancellor of the Exchequer",
+    "Secretary of State for Defence",
+    "Secretary of State for Digital, Culture, Media and Sport",
+    "Deputy Prime Minister",
+    "Secretary of State for Education",
+    "Secretary of State for Energy and Climate Change",
+    "Secretary of State for Environment, Food and Rural Affairs",
+    "Secretary of State for Exiting the European Union",
+    "Secretary of State for Foreign and Commonwealth Affairs",
+    "Secretary of State for Health and Social Care",
+    "Secretary of State for the Home Department",
+    "Secretary of State for Housing, Communities and Local Government",
+    "House of Commons Commission",
+    "Secretary of State for International Development",
+    "Secretary of State for International Trade",
+    "Secretary of State for Justice",
+    "Leader of the House",
+    "Secretary of State for Northern Ireland",
+    "Prime Minister",
+    "Secretary of State for Scotland",
+    "Speaker's Committee on the Electoral Commission",
+    "Speaker's Committee for the Independent Parliamentary Standards Authority",
+    "Secretary of State for Transport",
+    "Secretary of State for Wales",
+    "Minister for Women and Equalities",
+    "Secretary of State for Work and Pensions",
+]
+
+# some answering bodies should be left alone...
+WS_LEAVE_ALONE = (
+    "Speaker's Committee on the Electoral Commission",
+    "Speaker's Committee for the Independent Parliamentary Standards Authority",
+    "House of Commons Commission",
+)
+
+# ignored when putting headings in alphabetical order
+# e.g. `Secretary of State for Defence` is sorted under D
+ROLE_PREFIXES = ("secretary of state for ", "minister for ", "the ")
+
+
+def heading_for(raw_name: str, targets: Dict[str, str]) -> str:
+    """The Written Statements heading for an answering body name from the portal."""
+    if raw_name in WS_LEAVE_ALONE:
+        return raw_name
+
+    # replace the answering body name as provided by the portal with the `Target` as provided by mnis
+    heading = targets.get(raw_name, raw_name)
+
+    # We do not want `the ` at the begining except for The Chancellor of the Exchequer
+    if heading[0:4] == "the ":
+        heading = heading[4:].replace(
+            "Chancellor of the Exchequer", "The Chancellor of the Exchequer"
+        )
+    return heading
+
+
+def sort_name(heading: str) -> str:
+    name = heading.lower()
+    for prefix in ROLE_PREFIXES:
+        if name.startswith(prefix):
+            name = name[len(prefix) :]
+    return name
+
+
+def load_snapshot() -> Optional[bytes]:
+    try:
+        return SNAPSHOT_PATH.read_bytes()
+    except OSError:
+        return None
+
+
+def snapshot_age() -> Optional[float]:
+    """Seconds since the snapshot was saved, None if there isn't one."""
+    try:
+        return time.time() - SNAPSHOT_PATH.stat().st_mtime
+    except OSError:
+        return None
+
+
+def save_snapshot(content: bytes):
+    try:
+        CACHE_DIR.mkdir(parents=True, exist_ok=True)
+        SNAPSHOT_PATH.write_bytes(content)
+    except OSError:
+        # not being able to cache is not a reason to stop
+        pass
+
+
+def refresh_snapshot() -> Optional[bytes]:
+    """Get the AnsweringBodies data from MNIS and save it.
+
+    Returns None if MNIS can't be reached.
+    """
+    url = MNIS_ANSWERING_BODIES_URL
+    try:
+        response = http_client.get(url)
+    except requests.RequestException as e:
+        # 404 and other HTTP errors will be caught here.
+        logger.warning(
+            "Could not get the written statement names from MNIS. "
+            f"Check the following URL is working, {url}\n{e}"
+        )
+        return None
+
+    # saved even if unchanged, so it is not fetched again for a while
+    save_snapshot(response.content)
+    return response.content
+
+
+def current_snapshot() -> Optional[bytes]:
+    """The saved AnsweringBodies data, refreshed first if missing or old.
+
+    If it can't be refreshed the saved copy, however old, is used. Returns
+    None if MNIS can't be reached and nothing has been saved yet.
+    """
+    snapshot = load_snapshot()
+    age = snapshot_age()
+    if snapshot is not None and age is not None and age < SNAPSHOT_MAX_AGE:
+        return snapshot
+
+    content = refresh_snapshot()
+    if content is not None:
+        return content
+    if snapshot is not None:
+        logger.warning(f"Using the copy saved at {SNAPSHOT_PATH}")
+    return snapshot
+
+
+def parse_targets(content: bytes) -> Dict[str, str]:
+    """Map each answering body's ShortName to its Target."""
+    targets = {}
+    mnis_root = etree.fromstring(content)
+    for answering_body in mnis_root.xpath("/AnsweringBodies/AnsweringBody"):
+        short_name = answering_body.findtext("ShortName").strip()
+        targets[short_name] = answering_body.findtext("Target").strip()
+    return targets
+
+
+def read_override() -> Optional[List[str]]:
+    try:
+        lines = OVERRIDE_PATH.read_text(encoding="utf-8").splitlines()
+    except OSError:
+        return None
+    return [
+        line.strip() for line in lines if line.strip() and not line.startswith("#")
+    ]
+
+
+def derive_sort_order(
+    targets: Dict[str, str], override: Optional[List[str]] = None
+) -> List[str]:
+    """Headings from the override file first, then the rest alphabetically."""
+    pinned = override or []
+    headings = {heading_for(name, targets) for name in targets}
+    headings.difference_update(pinned)
+    return pinned + sorted(headings, key=sort_name)
+
+
+def snapshot_version(content: bytes, override: Optional[List[str]]) -> str:
+    version = hashlib.sha1(content)
+    version.update("\n".join(override or []).encode("utf-8"))
+    return version.hexdigest()
+
+
+def sort_order(
+    version: str, targets: Dict[str, str], override: Optional[List[str]]
+) -> List[str]:
+    """The Written Statements order for a snapshot, only rebuilt when it changes."""
+    try:
+        with open(SORT_ORDER_PATH, encoding="utf-8") as f:
+            cached = json.load(f)
+        if cached["version"] == version:
+            return cached["order"]
+    except (OSError, ValueError, KeyError, TypeError):
+        pass
+
+    order = derive_sort_order(targets, override)
+    try:
+        CACHE_DIR.mkdir(parents=True, exist_ok=True)
+        with open(SORT_ORDER_PATH, "w", encoding="utf-8") as f:
+            json.dump({"version": version, "order": order}, f, indent=2)
+    except OSError:
+        pass
+    return order
+
+
+class AnsweringBodyHeadings(dict):
+    """Map answering body names, as given by the portal, to (heading, sort rank).
+
+    Every name MNIS knows about is worked out up front. Any other name is
+    worked out the first time it is looked up and then remembered.
+    Headings not in the sort order sort last.
+    """
+
+    def __init__(self, targets: Dict[str, str], order: List[str]):
+        super().__init__()
+        self.targets = targets
+        self.ranks = {heading: rank for rank, heading in enumerate(order)}
+        # after every heading in the sort order
+        self.unknown_rank = len(order)
+        for short_name in targets:
+            self[short_name]
+
+    def __missing__(self, raw_name: str) -> Tuple[str, int]:
+        heading = heading_for(raw_name, self.targets)
+        value = self[raw_name] = (heading, self.ranks.get(heading, self.unknown_rank))
+        return value
+
+
+# headings tables already built, keyed by snapshot version
+_headings_cache: Dict[str, AnsweringBodyHeadings] = {}
+
+
+def answering_body_headings(
+    content: Optional[bytes] = None,
+) -> AnsweringBodyHeadings:
+    """Return the headings table for a MNIS AnsweringBodies response.
+
+    If content is None the current snapshot is used (see current_snapshot).
+    """
+    if content is None:
+        content = current_snapshot()
+    if not content:
+        return AnsweringBodyHeadings({}, read_override() or FALLBACK_SORT_ORDER)
+
+    override = read_override()
+    version = snapshot_version(content, override)
+    table = _headings_cache.get(version)
+    if table is None:
+        targets = parse_targets(content)
+        table = AnsweringBodyHeadings(targets, sort_order(version, targets, override))
+        _headings_cache[version] = table
+    return table
+
+
+def main():
+    # e.g. run by a scheduled task so part 1 never has to wait for MNIS
+    if refresh_snapshot() is None:
+        sys.exit(1)
+    print(f"Saved the MNIS answering bodies to {SNAPSHOT_PATH}")
+
+
+if __name__ == "__main__":
+    main()
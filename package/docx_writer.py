@@ -0,0 +1,332 @@
+"""
+Write the Questions Tabled proof (the HTML made by `buildUpHTML`) as a .docx.
+
+The .docx is put together directly with zipfile and lxml so there is no need
+for Word, or any other library, to be installed. Only the HTML used by the
+proof is understood: headings, paragraphs, tables, bold text, line breaks and
+the yellow and pink marker spans, which become Word highlights.
+"""
+
+# standard library imports
+import re
+import zipfile
+from typing import Any, BinaryIO, List, Optional, Tuple, Union
+
+# 3rd party imports
+from lxml import etree
+from lxml.etree import Element, SubElement, _Element
+
+
+W_NS = "http://schemas.openxmlformats.org/wordprocessingml/2006/main"
+W = f"{{{W_NS}}}"
+XML_SPACE = "{http://www.w3.org/XML/1998/namespace}space"
+
+# Word highlight colour for each class of marker span
+HIGHLIGHTS = {"marker": "yellow", "marker-pink": "magenta"}
+
+HEADING_STYLES = {
+    "h1": "Heading1",
+    "h2": "Heading2",
+    "h3": "Heading3",
+    "h4": "Heading4",
+    "h5": "Heading5",
+    "h6": "Heading5",
+}
+PARAGRAPH_TAGS = {"p", "li", *HEADING_STYLES}
+BOLD_TAGS = {"strong", "b"}
+SKIP_TAGS = {"head", "script", "style"}
+# elements that only contain other blocks (and maybe loose text)
+CONTAINER_TAGS = {
+    "article",
+    "blockquote",
+    "body",
+    "div",
+    "footer",
+    "header",
+    "main",
+    "nav",
+    "ol",
+    "section",
+    "ul",
+}
+
+# question paragraphs are indented with the question number hanging and the
+# UIN is tabbed to the right margin (twips)
+QUESTION_INDENT = "567"
+RIGHT_TAB = "9638"
+
+WHITESPACE = re.compile(r"[ \t\r\n]+")
+
+# a run is its text, or BREAK or TAB, and its (bold, highlight) format
+BREAK = object()
+TAB = object()
+Format = Tuple[bool, Optional[str]]
+Run = Tuple[Any, Format]
+
+
+CONTENT_TYPES = """<?xml version="1.0" encoding="UTF-8" standalone="yes"?>
+<Types xmlns="http://schemas.openxmlformats.org/package/2006/content-types">
+<Default Extension="rels" ContentType="application/vnd.openxmlformats-package.relationships+xml"/>
+<Default Extension="xml" ContentType="application/xml"/>
+<Override PartName="/word/document.xml" ContentType="application/vnd.openxmlformats-officedocument.wordprocessingml.document.main+xml"/>
+<Override PartName="/word/styles.xml" ContentType="application/vnd.openxmlformats-officedocument.wordprocessingml.styles+xml"/>
+</Types>"""
+
+PACKAGE_RELS = """<?xml version="1.0" encoding="UTF-8" standalone="yes"?>
+<Relationships xmlns="http://schemas.openxmlformats.org/package/2006/relationships">
+<Relationship Id="rId1" Type="http://schemas.openxmlformats.org/officeDocument/2006/relationships/officeDocument" Target="word/document.xml"/>
+</Relationships>"""
+
+DOCUMENT_RELS = """<?xml version="1.0" encoding="UTF-8" standalone="yes"?>
+<Relationships xmlns="http://schemas.openxmlformats.org/package/2006/relationships">
+<Relationship Id="rId1" Type="http://schemas.openxmlformats.org/officeDocument/2006/relationships/styles" Target="styles.xml"/>
+</Relationships>"""
+
+
+def _heading_style(style_id: str, name: str, size: int, space_before: int) -> str:
+    return (
+        f'<w:style w:type="paragraph" w:styleId="{style_id}">'
+        f'<w:name w:val="{name}"/><w:basedOn w:val="Normal"/><w:next w:val="Normal"/>'
+        f'<w:qFormat/><w:pPr><w:keepNext/><w:spacing w:before="{space_before}" w:after="120"/></w:pPr>'
+        f'<w:rPr><w:b/><w:sz w:val="{size}"/></w:rPr></w:style>'
+    )
+
+
+STYLES = (
+    '<?xml version="1.0" encoding="UTF-8" standalone="yes"?>'
+    f'<w:styles xmlns:w="{W_NS}">'
+    "<w:docDefaults><w:rPrDefault><w:rPr>"
+    '<w:rFonts w:ascii="Arial" w:hAnsi="Arial" w:cs="Arial"/>'
+    '<w:sz w:val="22"/><w:lang w:val="en-GB"/>'
+    "</w:rPr></w:rPrDefault>"
+    '<w:pPrDefault><w:pPr><w:spacing w:after="120"/></w:pPr></w:pPrDefault>'
+    "</w:docDefaults>"
+    '<w:style w:type="paragraph" w:default="1" w:styleId="Normal">'
+    '<w:name w:val="Normal"/><w:qFormat/></w:style>'
+    + _heading_style("Heading1", "heading 1", 40, 240)
+    + _heading_style("Heading2", "heading 2", 32, 240)
+    + _heading_style("Heading3", "heading 3", 28, 480)
+    + _heading_style("Heading4", "heading 4", 24, 240)
+    + _heading_style("Heading5", "heading 5", 20, 120)
+    + "</w:styles>"
+)
+
+
+def write_docx(html_tree, file: Union[str, BinaryIO]) -> None:
+    """Write the body of `html_tree` (an lxml HTML tree or element) to `file`."""
+    root = html_tree.getroot() if hasattr(html_tree, "getroot") else html_tree
+    body = root.find("body")
+    if body is None:
+        body = root
+
+    document = Element(W + "document", nsmap={"w": W_NS})
+    doc_body = SubElement(document, W + "body")
+    _append_blocks(body, doc_body)
+    doc_body.append(_section_properties())
+
+    with zipfile.ZipFile(file, "w", zipfile.ZIP_DEFLATED) as docx:
+        docx.writestr("[Content_Types].xml", CONTENT_TYPES)
+        docx.writestr("_rels/.rels", PACKAGE_RELS)
+        docx.writestr("word/_rels/document.xml.rels", DOCUMENT_RELS)
+        docx.writestr("word/styles.xml", STYLES)
+        docx.writestr(
+            "word/document.xml",
+            etree.tostring(
+                document, xml_declaration=True, encoding="UTF-8", standalone=True
+            ),
+        )
+
+
+def _append_blocks(html_parent: _Element, out_parent: _Element) -> None:
+    """Add a Word paragraph or table for each block in html_parent.
+
+    Text directly in html_parent, and inline elements and text between its
+    blocks, are put in paragraphs of their own.
+    """
+    loose_runs: List[Run] = []
+    if html_parent.text:
+        loose_runs.append((html_parent.text, (False, None)))
+
+    for child in html_parent:
+        tag = child.tag
+        if not isinstance(tag, str) or tag in SKIP_TAGS:
+            # comments and processing instructions
+            pass
+        elif tag == "table" or tag in PARAGRAPH_TAGS or tag in CONTAINER_TAGS:
+            _append_loose_paragraph(loose_runs, out_parent)
+            loose_runs = []
+            if tag == "table":
+                out_parent.append(_table(child))
+            elif tag in PARAGRAPH_TAGS:
+                out_parent.append(_paragraph(child))
+            else:
+                _append_blocks(child, out_parent)
+        elif tag == "br":
+            loose_runs.append((BREAK, (False, None)))
+        else:
+            # span, strong etc.
+            _collect_runs(child, (False, None), loose_runs)
+
+        if child.tail:
+            loose_runs.append((child.tail, (False, None)))
+
+    _append_loose_paragraph(loose_runs, out_parent)
+
+
+def _append_loose_paragraph(runs: List[Run], out_parent: _Element) -> None:
+    # white space between blocks does not make a paragraph
+    tidy_runs = _tidy_runs(runs)
+    if tidy_runs:
+        paragraph = Element(W + "p")
+        _append_runs(tidy_runs, paragraph)
+        out_parent.append(paragraph)
+
+
+def _paragraph(html_ele: _Element) -> _Element:
+    paragraph = Element(W + "p")
+    paragraph_props = SubElement(paragraph, W + "pPr")
+
+    style = HEADING_STYLES.get(html_ele.tag)
+    if style:
+        SubElement(paragraph_props, W + "pStyle", {W + "val": style})
+    if "questionContainer" in html_ele.get("class", "").split():
+        tabs = SubElement(paragraph_props, W + "tabs")
+        SubElement(tabs, W + "tab", {W + "val": "right", W + "pos": RIGHT_TAB})
+        SubElement(
+            paragraph_props,
+            W + "ind",
+            {W + "left": QUESTION_INDENT, W + "hanging": QUESTION_INDENT},
+        )
+
+    runs: List[Run] = []
+    _collect_runs(html_ele, (False, None), runs)
+    _append_runs(_tidy_runs(runs), paragraph)
+
+    if len(paragraph_props) == 0:
+        paragraph.remove(paragraph_props)
+
+    return paragraph
+
+
+def _append_runs(runs: List[Run], paragraph: _Element) -> None:
+    for text, (bold, highlight) in runs:
+        run = SubElement(paragraph, W + "r")
+        if bold or highlight:
+            run_props = SubElement(run, W + "rPr")
+            if bold:
+                SubElement(run_props, W + "b")
+            if highlight:
+                SubElement(run_props, W + "highlight", {W + "val": highlight})
+        if text is BREAK:
+            SubElement(run, W + "br")
+        elif text is TAB:
+            SubElement(run, W + "tab")
+        else:
+            t = SubElement(run, W + "t")
+            t.text = text
+            t.set(XML_SPACE, "preserve")
+
+
+def _collect_runs(html_ele: _Element, fmt: Format, runs: List[Run]) -> None:
+    bold, highlight = fmt
+    if html_ele.tag in BOLD_TAGS:
+        bold = True
+    for class_name in html_ele.get("class", "").split():
+        if class_name in HIGHLIGHTS:
+            # markers are bold as well as highlighted in the HTML version
+            bold, highlight = True, HIGHLIGHTS[class_name]
+    fmt = (bold, highlight)
+
+    if "uin" in html_ele.get("class", "").split():
+        runs.append((TAB, (False, None)))
+
+    if html_ele.text:
+        runs.append((html_ele.text, fmt))
+    for child in html_ele:
+        if child.tag == "br":
+            runs.append((BREAK, fmt))
+        elif isinstance(child.tag, str) and child.tag not in SKIP_TAGS:
+            _collect_runs(child, fmt, runs)
+        if child.tail:
+            runs.append((child.tail, fmt))
+
+
+def _tidy_runs(runs: List[Run]) -> List[Run]:
+    """Collapse white space as a browser would and merge runs with the same format."""
+    tidy: List[Run] = []
+    for text, fmt in runs:
+        if text not in (BREAK, TAB):
+            text = WHITESPACE.sub(" ", text)
+            if tidy and tidy[-1][0] not in (BREAK, TAB) and tidy[-1][1] == fmt:
+                tidy[-1] = (tidy[-1][0] + text, fmt)
+                continue
+        tidy.append((text, fmt))
+
+    # no space at the start or end of a paragraph
+    if tidy and tidy[0][0] not in (BREAK, TAB):
+        tidy[0] = (tidy[0][0].lstrip(" "), tidy[0][1])
+    if tidy and tidy[-1][0] not in (BREAK, TAB):
+        tidy[-1] = (tidy[-1][0].rstrip(" "), tidy[-1][1])
+
+    return [run for run in tidy if run[0] != ""]
+
+
+def _table(html_table: _Element) -> _Element:
+    table = Element(W + "tbl")
+    table_props = SubElement(table, W + "tblPr")
+    SubElement(table_props, W + "tblW", {W + "w": "0", W + "type": "auto"})
+
+    html_rows = [
+        [cell for cell in html_row if cell.tag in ("td", "th")]
+        for html_row in html_table.iter("tr")
+    ]
+    grid = SubElement(table, W + "tblGrid")
+    for _ in range(max((len(cells) for cells in html_rows), default=0)):
+        SubElement(grid, W + "gridCol")
+
+    for html_row, html_cells in zip(html_table.iter("tr"), html_rows):
+        row = SubElement(table, W + "tr")
+        line_under = "lineunder" in html_row.get("class", "").split()
+
+        for html_cell in html_cells:
+            cell = SubElement(row, W + "tc")
+            cell_props = SubElement(cell, W + "tcPr")
+            SubElement(cell_props, W + "tcW", {W + "w": "0", W + "type": "auto"})
+            if line_under:
+                borders = SubElement(cell_props, W + "tcBorders")
+                SubElement(
+                    borders,
+                    W + "bottom",
+                    {W + "val": "single", W + "sz": "4", W + "color": "000000"},
+                )
+
+            if any(child.tag in PARAGRAPH_TAGS for child in html_cell):
+                _append_blocks(html_cell, cell)
+            else:
+                cell.append(_paragraph(html_cell))
+
+            # every cell must end with a paragraph
+            if cell[-1].tag != W + "p":
+                SubElement(cell, W + "p")
+
+    return table
+
+
+def _section_properties() -> _Element:
+    # A4 with 2cm margins
+    section = Element(W + "sectPr")
+    SubElement(section, W + "pgSz", {W + "w": "11906", W + "h": "16838"})
+    SubElement(
+        section,
+        W + "pgMar",
+        {
+            W + "top": "1134",
+            W + "right": "1134",
+            W + "bottom": "1134",
+            W + "left": "1134",
+            W + "header": "709",
+            W + "footer": "709",
+            W + "gutter": "0",
+        },
+    )
+    return section
@@ -0,0 +1,124 @@
+"""
+Questions from the EQM NoticeOfQuestions feed, decoded into small records.
+
+`decode_feed` walks the JSON once. After that the questions can be counted
+and rendered (as HTML, Word or JSON) without going back to the raw dicts.
+"""
+
+# standard library imports
+from datetime import date, datetime
+from typing import Any, Dict, List, Optional
+
+# question types used by EQM. Anything else is an ordinary written question
+SUBSTANTIVE = "SUBSTANTIVE"
+TOPICAL = "TOPICAL"
+NAMEDDAY = "NAMEDDAY"
+ORDINARY = "ORDINARY"
+
+
+class Question:
+    """One tabled question. `number` is its position in its block, from 1."""
+
+    __slots__ = (
+        "number",
+        "type",
+        "member",
+        "constituency",
+        "text",
+        "uin",
+        "transferred",
+        "declared_interest",
+        "answering_body",
+    )
+
+    def __init__(self, number: int, question: Dict[str, Any]):
+        self.number = number
+        self.type: Optional[str] = question.get("Type")
+        self.member: Optional[str] = question.get("Member")
+        self.constituency: Optional[str] = question.get("Constituency")
+        self.text: Optional[str] = question.get("Text")
+        self.uin: Optional[str] = question.get("UIN")
+        self.transferred = bool(question.get("IsTransfer"))
+        self.declared_interest = question.get("DeclaredInterest") != ""
+        self.answering_body: str = question.get("AnsweringBody", "")
+
+    @property
+    def number_label(self) -> str:
+        # e.g. `T1` for topicals and `3 N` for named day questions
+        prefix = "T" if self.type == TOPICAL else ""
+        suffix = " N" if self.type == NAMEDDAY else ""
+        return f"{prefix}{self.number}{suffix}"
+
+    @property
+    def uin_label(self) -> str:
+        interest = "[R] " if self.declared_interest else ""
+        transferred = "[Transferred] " if self.transferred else ""
+        return f"{interest}{transferred}({self.uin})"
+
+    @property
+    def needs_highlighting(self) -> bool:
+        # only the first topical question is checked
+        return self.type != TOPICAL or self.number == 1
+
+    def as_dict(self) -> Dict[str, Any]:
+        return {name: getattr(self, name) for name in self.__slots__}
+
+
+class QuestionBlock:
+    """The questions for one answering body to be answered on one day."""
+
+    __slots__ = ("date", "description", "questions")
+
+    def __init__(self, block_date: date, description: str, questions: List[Question]):
+        self.date = block_date
+        self.description = description
+        self.questions = questions
+
+    def as_dict(self) -> Dict[str, Any]:
+        return {
+            "date": self.date.isoformat(),
+            "description": self.description,
+            "questions": [question.as_dict() for question in self.questions],
+        }
+
+
+def decode_feed(eqm_data: List[Dict[str, Any]]) -> List[QuestionBlock]:
+    """Decode the EQM feed (for the questions tabled on one day).
+
+    Every block is kept, including any for the tabling date itself.
+    """
+    blocks = []
+    for question_block in eqm_data:
+        block_date_text = question_block.get("Date")
+        questions = [
+            Question(j, question)
+            for j, question in enumerate(question_block.get("Questions", []), 1)
+        ]
+        blocks.append(
+            QuestionBlock(
+                datetime.strptime(block_date_text, "%Y-%m-%d").date(),
+                question_block.get("Description", ""),
+                questions,
+            )
+        )
+    return blocks
+
+
+def answering_body_targets(mnis_data: Optional[Dict[str, Any]]) -> Dict[str, str]:
+    """Map answering body names to their `Target` (e.g. `the Prime Minister`)."""
+    answers_dict: Dict[str, str] = {}
+    if mnis_data:
+        answering_bodies = mnis_data.get("AnsweringBodies", {}).get("AnsweringBody", [])
+        for answering_body in answering_bodies:
+            answers_dict[answering_body.get("Name")] = answering_body.get("Target")
+    return answers_dict
+
+
+def count_questions(blocks: List[QuestionBlock]) -> Dict[str, int]:
+    """Number of questions of each type, keyed by type."""
+    counts = {ORDINARY: 0, NAMEDDAY: 0, SUBSTANTIVE: 0, TOPICAL: 0}
+    for block in blocks:
+        for question in block.questions:
+            question_type = question.type if question.type in counts else ORDINARY
+            counts[question_type] += 1
+    return counts
@@ -1,17 +1,26 @@
 # standard library imports
 # for getting files form urls
+from bisect import bisect_right
+from contextlib import ExitStack
+from copy import deepcopy
 from datetime import date, time
+from functools import lru_cache
 import html  # used to sort out html named entities
+from os import path
 import re  # regular expresions
-import ssl
-from typing import Optional
-import urllib.error
-import urllib.request
+from typing import Any, Callable, Dict, List, Optional
 
 # 3rd party imports
 from lxml import etree
 from lxml.etree import Element, SubElement
 import lxml.html as lhtml
+import requests
+
+# shared HTTP client
+try:
+    import http_client
+except ImportError:
+    import package.http_client as http_client
 
 
 # these are XML elements names that map to paragraph styles in InDesign
@@ -95,6 +104,83 @@ def clean_up_text(element):
         element.getparent().remove(element)
 
 
+class InDesignOutput:
+    """Output XML for InDesign, written to file a piece at a time.
+
+    Use as a context manager. Builders append to `root` as usual and call
+    `flush` once a piece (e.g. a DayItem) is complete. The piece is cleaned
+    up, written out and removed from `root` so only the current piece is
+    held in memory. The file is `filepath + fileextension`, or
+    `filepath + "2" + fileextension` if that can't be written.
+    """
+
+    def __init__(
+        self,
+        filepath: str,
+        fileextension: str,
+        clean_up: Callable[[Any], None] = clean_up_text,
+    ):
+        self.filepath = filepath
+        self.fileextension = fileextension
+        self.clean_up = clean_up
+        self.root = Element("root")
+        self.output_path = filepath + fileextension
+        self._xf = None
+        self._root_open = False
+        self._stack = ExitStack()
+
+    def __enter__(self):
+        # make sure it works even if we dont have permision to modify the file
+        for output_path in (
+            self.filepath + self.fileextension,
+            self.filepath + "2" + self.fileextension,
+        ):
+            self.output_path = output_path
+            try:
+                output_file = self._stack.enter_context(open(output_path, "wb"))
+            except OSError:
+                continue
+            self._xf = self._stack.enter_context(
+                etree.xmlfile(output_file, encoding="ASCII")
+            )
+            break
+        return self
+
+    def flush(self):
+        """Clean up and write out everything added to `root` since the last flush."""
+        if len(self.root) == 0:
+            return
+        # replace any non breaking spaces with ordinary spaces etc.
+        self.clean_up(self.root)
+        if self._xf is not None:
+            if not self._root_open:
+                self._stack.enter_context(self._xf.element("root"))
+                self._root_open = True
+            for element in self.root:
+                self._xf.write(element)
+            self._xf.flush()
+        self.root.clear()
+
+    def __exit__(self, exc_type, exc_value, traceback):
+        if exc_type is None:
+            self.flush()
+            if self._xf is not None and not self._root_open:
+                # nothing was output
+                self._xf.write(Element("root"))
+        self._stack.__exit__(exc_type, exc_value, traceback)
+
+        if exc_type is None:
+            if self._xf is not None:
+                print("\nOutput file is located at:\n", path.abspath(self.output_path))
+            else:
+                print(
+                    "Error:\tThe file "
+                    + path.abspath(self.output_path)
+                    + " dose not seem to be writable."
+                )
+        return False
+
+
 def smart_to_dumb_quotes(string):
     """
     We have decided to remove curly (a.k.a. typeographer's) Quotes.
@@ -160,13 +246,11 @@ def get_mnis_data(laying_minister_lookup):
 
     # the MNIS url where the data is stored
     url = "http://data.parliament.uk/membersdataplatform/services/mnis/members/query/House=Commons|IsEligible=true"
-    # ignore the ssl certificate
-    context = ssl._create_unverified_context()
 
     print("\nGetting Laying Minister names from,\n{}".format(url))
     try:
-        response = urllib.request.urlopen(url, context=context)
-    except urllib.error.HTTPError as e:
+        response = http_client.get(url)
+    except requests.RequestException as e:
         # 404 and other HTTP errors will be caught here.
         print(
             "WARNING: There is a error in getting the laying ministers names from MNIS\n"
@@ -175,7 +259,7 @@ def get_mnis_data(laying_minister_lookup):
         )  # actually output the error
     else:
         print("Got the data.")
-        mnis_root = etree.parse(response).getroot()
+        mnis_root = etree.fromstring(response.content)
         # check if the returned element has children. If not warn the user.
         if len(mnis_root) == 0:
             print(
@@ -206,30 +290,128 @@ def get_mnis_data(laying_minister_lookup):
     return laying_minister_lookup
 
 
-def notes_relevant_docs(dayItem, output_root, has_children, day_item_is_child):
-    if has_children is False:
+class DayItemRecord:
+    """The parts of a DayItem element that the section builders need.
+
+    Everything is read from the element in a single pass by `read_day_item`
+    so the builders do not need to keep calling find and findtext.
+    Values are None where the corresponding element is missing.
+    """
+
+    __slots__ = (
+        "element",
+        "type",
+        "title",
+        "has_title",
+        "notes",
+        "is_child",
+        "has_children",
+        "business_item_type",
+        "item_text",
+        "time",
+        "duration",
+        "standing_order",
+        "sponsors",
+        "sponsor_notes",
+        "detail_notes",
+        "relevant_documents",
+        "amendments",
+    )
+
+    def __init__(self, element):
+        self.element = element
+        self.type: Optional[str] = None
+        self.title = ""
+        self.has_title = False
+        self.notes: Optional[str] = None
+        self.is_child = False
+        self.has_children = False
+        self.business_item_type: Optional[str] = None
+        self.item_text = ""
+        self.time: Optional[str] = None
+        self.duration = ""
+        self.standing_order = ""
+        self.sponsors = None
+        self.sponsor_notes: Optional[str] = None
+        self.detail_notes: Optional[str] = None
+        self.relevant_documents: Optional[str] = None
+        self.amendments = None
+
+
+def read_day_item(day_item) -> DayItemRecord:
+    record = DayItemRecord(day_item)
+
+    parent = day_item.getparent()
+    record.is_child = parent is not None and parent.tag == "ChildDayItems"
+
+    for child in day_item:
+        tag = child.tag
+        if tag == "DayItemType":
+            record.type = child.text or ""
+        elif tag == "Title":
+            record.has_title = True
+            record.title = child.text or ""
+        elif tag == "Notes":
+            record.notes = child.text or ""
+        elif tag == "BusinessItemDetail":
+            for detail in child:
+                tag = detail.tag
+                if tag == "BusinessItemType":
+                    record.business_item_type = detail.text or ""
+                elif tag == "ItemText":
+                    record.item_text = detail.text or ""
+                elif tag == "Time":
+                    record.time = detail.text or ""
+                elif tag == "Duration":
+                    record.duration = detail.text or ""
+                elif tag == "StandingOrders":
+                    record.standing_order = detail.findtext(
+                        "StandingOrder/Text", default=""
+                    )
+                elif tag == "Sponsors":
+                    record.sponsors = detail
+                elif tag == "SponsorNotes":
+                    record.sponsor_notes = detail.text or ""
+                elif tag == "Notes":
+                    record.detail_notes = detail.text or ""
+                elif tag == "RelevantDocuments":
+                    record.relevant_documents = detail.text or ""
+                elif tag == "Amendments":
+                    record.amendments = detail
+                elif tag == "ChildDayItems":
+                    record.has_children = len(detail) > 0
+
+    return record
+
+
+def day_item_records(element) -> List[DayItemRecord]:
+    """Read every DayItem below element (including child items), in document order."""
+    return [read_day_item(day_item) for day_item in element.iter("DayItem")]
+
+
+def notes_relevant_docs(day_item: DayItemRecord, output_root):
+    if day_item.has_children is False:
         # get any notes
-        notes = dayItem.findtext("BusinessItemDetail/Notes")
+        notes = day_item.detail_notes
         if notes and notes.strip() != "":
             SubElement(output_root, "NoteHeading").text = "Notes:"
             SubElement(output_root, "NoteText").text = notes
 
-        relevant_documents = dayItem.findtext("BusinessItemDetail/RelevantDocuments")
+        relevant_documents = day_item.relevant_documents
         if relevant_documents and relevant_documents.strip() != "":
             SubElement(output_root, "NoteHeading").text = "Relevant Documents:"
             SubElement(output_root, "NoteText").text = relevant_documents
 
     # get notes and Relavant documents for parent item if last child
-    if dayItem.getnext() is None and day_item_is_child is True:
+    if day_item.is_child is True and day_item.element.getnext() is None:
+        parent_detail = day_item.element.getparent().getparent()
         # get any notes
-        notes = dayItem.getparent().getparent().findtext("Notes")
+        notes = parent_detail.findtext("Notes")
         if notes is not None and notes.strip() != "":
             SubElement(output_root, "NoteHeading").text = "Notes:"
             SubElement(output_root, "NoteText").text = notes
 
-        relevant_documents = (
-            dayItem.getparent().getparent().findtext("RelevantDocuments")
-        )
+        relevant_documents = parent_detail.findtext("RelevantDocuments")
         if relevant_documents is not None and relevant_documents.strip() != "":
             SubElement(output_root, "NoteHeading").text = "Relevant Documents:"
             SubElement(output_root, "NoteText").text = relevant_documents
@@ -240,11 +422,9 @@ def notes_relevant_docs(dayItem, output_root, has_children, day_item_is_child):
 #         if element.tag in PARA_ELEMENTS:
 
 
-def append_timing_so(output_root, current_element):
-    duration_text = current_element.findtext("BusinessItemDetail/Duration", default="")
-    so_text = current_element.findtext(
-        "BusinessItemDetail/StandingOrders/StandingOrder/Text", default=""
-    )
+def append_timing_so(output_root, day_item: DayItemRecord):
+    duration_text = day_item.duration
+    so_text = day_item.standing_order
 
     debate_timing_rubric = SubElement(output_root, "DebateTimingRubric")
 
@@ -259,9 +439,11 @@ def append_timing_so(output_root, current_element):
         SubElement(debate_timing_rubric, "SOReference").text = f"({so_text})"
 
 
-def append_amendments(dayItem, append_to, laying_minister_lookup):
+def append_amendments(day_item: DayItemRecord, append_to, laying_minister_lookup):
     # make sure we get any amendments
-    amendments = dayItem.findall("BusinessItemDetail/Amendments/Amendment")
+    if day_item.amendments is None:
+        return
+    amendments = day_item.amendments.findall("Amendment")
     previous_amendment_letter = ""
     for amendment in amendments:
         # add the amendment letter text e.g. Amendment (a)
@@ -301,11 +483,13 @@ def append_amendments(dayItem, append_to, laying_minister_lookup):
         ).strip()
 
 
-def append_presenter_sponsor(dayItem, append_to):
+def append_presenter_sponsor(day_item: DayItemRecord, append_to):
     # we don't need to include a laying_minister_lookup because
     # gov cant sponsor any items that take a presentor sponsor
     # this is a presentor sponsor and there can only be one of those
-    sponsor = dayItem.find("BusinessItemDetail/Sponsors/Sponsor")
+    if day_item.sponsors is None:
+        return
+    sponsor = day_item.sponsors.find("Sponsor")
     if sponsor is not None:
         sponsor_name = sponsor.findtext("Name", default="")
         relevant_interest = ""
@@ -316,51 +500,66 @@ def append_presenter_sponsor(dayItem, append_to):
         )
 
 
-def by_sort_order(sponsor_element):
-    sort_order = sponsor_element.findtext("SortOrder")
+def by_sort_order(sponsor):
+    # numeric sort orders first (in numeric order) then any others as text
+    sort_order = sponsor.get("SortOrder")
     try:
-        return int(sort_order)
-    except ValueError:
-        return sort_order
+        return (0, int(sort_order), "")
+    except (TypeError, ValueError):
+        return (1, 0, sort_order or "")
 
 
-def append_motion_sponosrs(dayItem, append_to, laying_minister_lookup):
-    sponsors = dayItem.find("BusinessItemDetail/Sponsors")
-    # motion amendment sponsor group
-    m_a_s_g = etree.Element("MotionSponsorGroup")
-    m_a_s_g.text = ""
-    sponsors = sorted(sponsors, key=by_sort_order)
-    for i, sponsor in enumerate(sponsors):
-        sponsor_name = sponsor.findtext("Name", default="")
-        member_id = sponsor.findtext("MemberId", default="")
+def extract_sponsors(sponsors_element, laying_minister_lookup):
+    """Return a list of sponsor names from a Sponsors element, sorted by SortOrder.
+
+    Each Sponsor is read in a single pass over its children rather than
+    with a findtext call per field. Names are replaced with the laying
+    minister name where there is one.
+    """
+    if sponsors_element is None:
+        return []
+    sponsors = sorted(
+        ({child.tag: child.text for child in sponsor} for sponsor in sponsors_element),
+        key=by_sort_order,
+    )
+    names = []
+    for sponsor in sponsors:
         # replace sponsor if they have a laying minister name
         # e.g. Mrs Theresa May -> The Prime Minister
-        if member_id in laying_minister_lookup:
-            sponsor_name = laying_minister_lookup[member_id]
-        sponsor_notes = dayItem.findtext("BusinessItemDetail/SponsorNotes")
-        sponsor_note_e = None
+        name = laying_minister_lookup.get(sponsor.get("MemberId") or "")
+        if name is None:
+            name = sponsor.get("Name") or ""
+        names.append(name)
+    return names
+
+
+def append_motion_sponosrs(
+    day_item: DayItemRecord, append_to, laying_minister_lookup
+):
+    sponsor_names = extract_sponsors(day_item.sponsors, laying_minister_lookup)
+    if len(sponsor_names) == 0:
+        return
+
+    sponsor_notes = day_item.sponsor_notes
+
+    # first 6 sponsors are in bold and each on one line
+    for i, sponsor_name in enumerate(sponsor_names[:6]):
+        motion_sponsor_e = SubElement(append_to, "MotionSponsor")
+        motion_sponsor_e.text = sponsor_name.strip()
         if (
             i == 0
             and sponsor_notes
             and sponsor_notes.strip() not in ("", "On behalf of")
         ):
-            sponsor_note_e = Element("SponsorNotes")
-            sponsor_note_e.text = "," + sponsor_notes
+            motion_sponsor_e.text += ", "
+            SubElement(motion_sponsor_e, "SponsorNotes").text = "," + sponsor_notes
 
-        # first 6 sponsors are in bold and each on one line
-        if i < 6:
-            motion_sponsor_e = SubElement(append_to, "MotionSponsor")
-            motion_sponsor_e.text = sponsor_name.strip()
-            if sponsor_note_e is not None:
-                motion_sponsor_e.text += ", "
-                motion_sponsor_e.append(sponsor_note_e)
-
-        # after the first 6 sponsors are not in bold and 3 per line
-        else:
-            m_a_s_g.text += sponsor_name + "\t"
-    if len(sponsors) > 6:
-        m_a_s_g.tail = "\u2029"  # will map to &#8233; paragraph sep
-        append_to.append(m_a_s_g)
+    # after the first 6 sponsors are not in bold and 3 per line
+    if len(sponsor_names) > 6:
+        # motion sponsor group
+        m_s_g = SubElement(append_to, "MotionSponsorGroup")
+        m_s_g.text = "\t".join(sponsor_names[6:]) + "\t"
+        m_s_g.tail = "\u2029"  # will map to &#8233; paragraph sep
 
 
 # def append_fromstring(parent, xml_string):
@@ -369,93 +568,155 @@ def append_motion_sponosrs(dayItem, append_to, laying_minister_lookup):
 #     parent.append(etree.fromstring(xml_string))
 
 
+# InDesign table namespaces
+AID = "http://ns.adobe.com/AdobeInDesign/4.0/"
+AID5 = "http://ns.adobe.com/AdobeInDesign/5.0/"
+
+# the maximum width of a table, this is measured in points
+MAX_TABLE_WIDTH = 466
+
+
+def _span(cell, attribute: str) -> int:
+    try:
+        return max(int(cell.get(attribute, 1)), 1)
+    except ValueError:
+        return 1
+
+
+def _cell_text(cell) -> Optional[str]:
+    text = cell.text
+    # remove extra new line from the end
+    if text and text[-1] == "\n":
+        text = text[:-1]
+    return text
+
+
+def html_table_to_indesign(table):
+    """Convert an HTML table element to an InDesign table element.
+
+    Each row is walked once. td and th cells are treated the same and
+    colspan and rowspan are carried over to InDesign's ccols and crows.
+    Cells in the first row are put in a bold paragraph.
+    """
+    rows = table.xpath("tbody/tr|thead/tr|tfoot/tr|tr")
+    row_count = len(rows)
+
+    # lay the cells out on a grid, taking account of any spans.
+    # placed maps (row, col) -> (html cell, colspan, rowspan)
+    placed = {}
+    covered = set()  # grid positions filled by a cell spanning from elsewhere
+    columns = 0
+    for row_index, row in enumerate(rows):
+        col = 0
+        for cell in row:
+            if cell.tag not in ("td", "th"):
+                continue
+            while (row_index, col) in covered:
+                col += 1
+            colspan = _span(cell, "colspan")
+            rowspan = min(_span(cell, "rowspan"), row_count - row_index)
+            placed[(row_index, col)] = (cell, colspan, rowspan)
+            for r in range(row_index, row_index + rowspan):
+                for c in range(col, col + colspan):
+                    if (r, c) != (row_index, col):
+                        covered.add((r, c))
+                    if c >= columns:
+                        columns = c + 1
+            col += colspan
+
+    # create InDesign table element
+    inDesign_table = Element(
+        "Table",
+        {
+            f"{{{AID}}}table": "table",
+            f"{{{AID5}}}tablestyle": "StandardTable",
+            f"{{{AID}}}tcols": str(columns),
+            f"{{{AID}}}trows": str(row_count),
+        },
+        nsmap={"aid": AID, "aid5": AID5},
+    )
+    if columns == 0:
+        return inDesign_table
+
+    column_width = MAX_TABLE_WIDTH / columns
+    # need to adjust the coll width depending on the numebr of columns
+    cell_attrib = {
+        f"{{{AID}}}ccols": "1",
+        f"{{{AID}}}ccolwidth": str(column_width),
+        f"{{{AID}}}crows": "1",
+        f"{{{AID}}}table": "cell",
+    }
+
+    # InDesign expects the cells in row order, leaving out any grid
+    # positions that are filled by a spanning cell
+    for row_index in range(row_count):
+        for col in range(columns):
+            if (row_index, col) in covered:
+                continue
+            cell_info = placed.get((row_index, col))
+            if cell_info is None:
+                # pad short rows with empty cells
+                SubElement(inDesign_table, "Cell", cell_attrib)
+                continue
+
+            html_cell, colspan, rowspan = cell_info
+            attrib = cell_attrib
+            if colspan > 1 or rowspan > 1:
+                attrib = dict(cell_attrib)
+                attrib[f"{{{AID}}}ccols"] = str(colspan)
+                attrib[f"{{{AID}}}ccolwidth"] = str(column_width * colspan)
+                attrib[f"{{{AID}}}crows"] = str(rowspan)
+            inDesign_cell = SubElement(inDesign_table, "Cell", attrib)
+
+            if row_index == 0:
+                SubElement(inDesign_cell, "DebateTimingRubric").text = _cell_text(
+                    html_cell
+                )
+            else:
+                inDesign_cell.text = _cell_text(html_cell)
+
+    return inDesign_table
+
+
+# anything that means the text has to go through the HTML parser
+# i.e. markup, entities or characters lxml will not accept as element text
+NEEDS_HTML_PARSER = re.compile(r"[<&\x00-\x08\x0b\x0c\x0e-\x1f]")
+
+
 def process_CDATA(text_from_xml):
+    # the same item text is often repeated on many days (especially in FBA)
+    # so the converted element is cached and a copy is returned each time
+    return deepcopy(_process_CDATA(text_from_xml))
+
+
+@lru_cache(maxsize=1024)
+def _process_CDATA(text_from_xml):
     unescaped = html.unescape(text_from_xml).strip()
+
+    # fast path for plain text (most motions) which has no need of the HTML parser
+    if not NEEDS_HTML_PARSER.search(unescaped):
+        cdata_element = Element("from_cdata")
+        if unescaped:
+            cdata_element.text = unescaped.replace("\r\n", "\n").replace("\r", "\n")
+        return cdata_element
+
     cdata_element_string = "<from_cdata>" + unescaped + "</from_cdata>"
     # create an lxml html element
     cdata_element = lhtml.fromstring(cdata_element_string)
 
     # ---- TABLES -----------------
 
-    # create a number for the max width of the table
-    max_table_width = 466  # this is measured in points
-
-    # get all the table elements
-    tables = cdata_element.xpath("//table")
     # go through the tables backwards because there could be tables in tables...
-    for table in reversed(tables):
-        table_rows = table.xpath("tbody/tr|thead/tr|tfoot/tr|tr")
-        # number of table rows
-        table_rows_number = len(table_rows)
-        # now find out the maximum number of cells in each row
-        max_cells = 0
-        for row in table_rows:
-            table_cells = row.xpath("td|th")
-            number_of_cells = len(table_cells)
-            if number_of_cells > max_cells:
-                max_cells = number_of_cells
-        # create InDesign table element
-        inDesign_tabel = etree.fromstring(
-            '<Table xmlns:aid="http://ns.adobe.com/AdobeInDesign/4.0/"'
-            ' xmlns:aid5="http://ns.adobe.com/AdobeInDesign/5.0/"'
-            ' aid:table="table" aid5:tablestyle="StandardTable"></Table>'
-        )
-        # fix rows and colls attributes
-        inDesign_tabel.set(
-            "{http://ns.adobe.com/AdobeInDesign/4.0/}tcols", str(max_cells)
-        )
-        inDesign_tabel.set(
-            "{http://ns.adobe.com/AdobeInDesign/4.0/}trows", str(table_rows_number)
-        )
-        # now actually add the cells to the InDesign table
-        for counter in range(max_cells * table_rows_number):
-            temp_cell = etree.SubElement(inDesign_tabel, "Cell")
-            temp_cell.set("{http://ns.adobe.com/AdobeInDesign/4.0/}ccols", "1")
-            # need to adjust the coll width depending on the numebr of columns
-            temp_cell.set(
-                "{http://ns.adobe.com/AdobeInDesign/4.0/}ccolwidth",
-                str(max_table_width / max_cells),
-            )
-            temp_cell.set("{http://ns.adobe.com/AdobeInDesign/4.0/}crows", "1")
-            temp_cell.set("{http://ns.adobe.com/AdobeInDesign/4.0/}table", "cell")
-
-        # now run through the InDesign table and add text
-        InDesign_cell_counter = 0
-        for row_counter in range(len(table_rows)):
-            table_cells = table_rows[row_counter].xpath("td")
-            for cell_counter in range(max_cells):
-                if cell_counter < len(table_rows[row_counter]):
-                    if row_counter == 0:
-                        bold_para_heading = etree.Element("DebateTimingRubric")
-                        bold_para_heading.text = table_cells[cell_counter].text
-                        # remove extra new line from the end
-                        if (
-                            bold_para_heading.text
-                            and bold_para_heading.text[-1] == "\n"
-                        ):
-                            bold_para_heading.text = bold_para_heading.text[:-1]
-                        inDesign_tabel[InDesign_cell_counter].append(bold_para_heading)
-                        # inDesign_tabel[InDesign_cell_counter].set('{http://ns.adobe.com/AdobeInDesign/4.0/}theader', '')
-                    else:
-                        inDesign_tabel[InDesign_cell_counter].text = table_cells[
-                            cell_counter
-                        ].text
-                        # remove extra new line from the end
-                        if (
-                            inDesign_tabel[InDesign_cell_counter].text
-                            and inDesign_tabel[InDesign_cell_counter].text[-1] == "\n"
-                        ):
-                            inDesign_tabel[InDesign_cell_counter].text = inDesign_tabel[
-                                InDesign_cell_counter
-                            ].text[:-1]
-                InDesign_cell_counter += 1
+    for table in reversed(list(cdata_element.iter("table"))):
+        inDesign_table = html_table_to_indesign(table)
 
         # if there is any tail text on the html, add it to the tail text of the InDesign table
         if table.tail:
-            inDesign_tabel.tail = table.tail
+            inDesign_table.tail = table.tail
 
         # replace the html table with an InDesign table
-        table.getparent().replace(table, inDesign_tabel)
+        table.getparent().replace(table, inDesign_table)
+
     if len(cdata_element) > 0 and cdata_element[-1].tail is None:
         cdata_element[-1].tail = "\n"
     elif len(cdata_element) > 0 and cdata_element[-1].tail is not None:
@@ -487,6 +748,46 @@ def format_time(time_string: str):
         return None
 
 
+def parse_date(date_string: Optional[str]) -> Optional[date]:
+    """Parse the date part of an ISO date or datetime e.g. 2022-05-20T00:00:00"""
+    if not date_string:
+        return None
+    try:
+        return date.fromisoformat(date_string.strip()[:10])
+    except ValueError:
+        return None
+
+
+def index_days(input_root) -> Dict[date, List[Any]]:
+    """Return a dictionary of date -> Day elements for all the Days/Day elements.
+
+    Each Date is parsed once. Days with the same date are kept in document
+    order.
+    """
+    days: Dict[date, List[Any]] = {}
+    for day_element in input_root.iterfind("Days/Day"):
+        day_date = parse_date(day_element.findtext("Date"))
+        if day_date is not None:
+            days.setdefault(day_date, []).append(day_element)
+    return days
+
+
+def first_day(days: Dict[date, List[Any]], day_date: Optional[date]) -> Optional[Any]:
+    """Return the first Day element from `index_days` for day_date, if any."""
+    day_elements = days.get(day_date) if day_date is not None else None
+    return day_elements[0] if day_elements else None
+
+
+def days_after(days: Dict[date, List[Any]], after: date) -> List[Any]:
+    """Return the Day elements from `index_days` dated after `after`, in date order."""
+    dates = sorted(days)
+    return [
+        day_element
+        for day_date in dates[bisect_right(dates, after) :]
+        for day_element in days[day_date]
+    ]
+
+
 # format date
 def format_date(datetime_string: str) -> Optional[str]:
     if isinstance(datetime_string, str) and len(datetime_string.split("-")) == 3:
@@ -543,15 +844,24 @@ def next_letter(old_letter: str) -> str:
             return letters[letters.index(old_letter[-1]) + 1]
 
 
+# every namespaced element and attribute, wherever the namespace is declared
+NAMESPACED_NODES = etree.XPath(
+    "descendant-or-self::*[namespace-uri()!='']"
+    " | descendant-or-self::*/@*[namespace-uri()!='']"
+)
+
+
 def dropns(root):
-    """Remove all namespaces as we will not need them and they can get in the way."""
-    for elem in root.iter():
-        parts = elem.tag.split(":")
-        if len(parts) > 1:
-            elem.tag = parts[-1]
-        entries = []
-        for attrib in elem.attrib:
-            if attrib.find(":") > -1:
-                entries.append(attrib)
-        for entry in entries:
-            del elem.attrib[entry]
+    """Remove all namespaces as we will not need them and they can get in the way.
+
+    The namespaced elements and attributes are found with one XPath query,
+    rather than by looking at every element in Python.
+    """
+    for node in NAMESPACED_NODES(root):
+        if isinstance(node, str):
+            # an attribute e.g. i:nil="true"
+            del node.getparent().attrib[node.attrname]
+        else:
+            node.tag = etree.QName(node).localname
+    # and remove the now unused namespace declarations
+    etree.cleanup_namespaces(root)
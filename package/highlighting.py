@@ -0,0 +1,301 @@
+"""
+Yellow and pink highlighting of the text of written questions.
+
+Mistakes that can appear anywhere in a question are described by the rules in
+RULES. These are combined into one regular expression so each question is
+scanned once.
+
+For a very large number of questions the work is split into chunks and done
+in a pool of processes. Each worker sends back the highlighted question text
+as serialised HTML, which is parsed again here, in the original order. Only a
+few chunks are sent ahead of the one being used, so a proof written out as it
+goes (see highlight_fragments) never holds the highlighting for a whole feed.
+"""
+
+# standard library imports
+from collections import deque
+from concurrent.futures import Future, ProcessPoolExecutor
+from concurrent.futures.process import BrokenProcessPool
+from itertools import islice
+import os
+import re
+from typing import Deque, Dict, Iterable, Iterator, List, NamedTuple, Optional, Tuple
+
+# 3rd party imports
+from lxml import html
+from lxml.etree import SubElement, _Element
+from lxml.html.builder import CLASS, SPAN
+
+# below this many questions a pool is slower than highlighting them here
+PARALLEL_THRESHOLD = 5000
+# questions sent to a worker at a time
+CHUNK_SIZE = 500
+# chunks, per process, sent to the pool ahead of the one being used
+CHUNKS_AHEAD = 2
+
+# (question text, answering body, question type)
+HighlightJob = Tuple[str, str, str]
+# (highlighted questionText span, or None and the error message)
+HighlightResult = Tuple[Optional[_Element], Optional[str]]
+# the same with the span serialised as HTML
+HighlightFragment = Tuple[Optional[str], Optional[str]]
+
+
+class HighlightRule(NamedTuple):
+    """A mistake to mark up anywhere in the text of a question."""
+
+    name: str  # must be a valid regex group name
+    pattern: str  # matched ignoring case
+    css_class: str
+    title: Optional[str] = None  # tool tip
+    replacement: Optional[str] = None  # shown instead of the matched text
+    upper: bool = False  # show the matched text in capitals
+
+    def show(self, matched: str) -> str:
+        if self.replacement is not None:
+            return self.replacement
+        return matched.upper() if self.upper else matched
+
+
+# To add a new check, add a rule here. Where rules overlap the first listed wins
+RULES: List[HighlightRule] = [
+    HighlightRule("redraft", r"suggested redraft", "marker", upper=True),
+    HighlightRule(
+        "spaces",
+        r"\s\s+",
+        "marker",
+        title="More than one space",
+        replacement="\u00a0\u00a0",
+    ),
+]
+
+RULES_BY_NAME = {rule.name: rule for rule in RULES}
+RULES_PATTERN = re.compile(
+    "|".join(f"(?P<{rule.name}>{rule.pattern})" for rule in RULES), re.IGNORECASE
+)
+
+# checks made at a fixed place in the question rather than by pattern
+EXPECTED_COMMA = HighlightRule("comma", "", "marker", title="Expected comma")
+EXPECTED_FULL_STOP = HighlightRule(
+    "full_stop", "", "marker", title="Expected full stop"
+)
+
+# a piece of question text and the rule that marks it up (None for plain text)
+Segment = Tuple[str, Optional[HighlightRule]]
+
+
+def highlight_questions(
+    jobs: List[HighlightJob],
+    answers_dict: Dict[str, str],
+    processes: Optional[int] = None,
+) -> List[HighlightResult]:
+    """Return a highlighted questionText span for each job, in the same order."""
+    if len(jobs) >= PARALLEL_THRESHOLD:
+        fragments = _highlight_in_pool(jobs, answers_dict, processes)
+        return [parse_fragment(fragment) for fragment in fragments]
+    return [_highlight(job, answers_dict) for job in jobs]
+
+
+def highlight_fragments(
+    jobs: Iterable[HighlightJob],
+    number_of_jobs: int,
+    answers_dict: Dict[str, str],
+    processes: Optional[int] = None,
+) -> Iterator[HighlightFragment]:
+    """Like highlight_questions but with the spans serialised as HTML.
+
+    The jobs are highlighted as the fragments are used (in a pool if there
+    are enough of them), so a proof can be written out while the feed is
+    highlighted without holding all of it at once.
+    """
+    if number_of_jobs >= PARALLEL_THRESHOLD:
+        return _highlight_in_pool(jobs, answers_dict, processes)
+    return (_serialise(_highlight(job, answers_dict)) for job in jobs)
+
+
+def parse_fragment(fragment: HighlightFragment) -> HighlightResult:
+    html_fragment, error_msg = fragment
+    if html_fragment is None:
+        return None, error_msg
+    return html.fragment_fromstring(html_fragment), None
+
+
+def _serialise(result: HighlightResult) -> HighlightFragment:
+    qn_text_ele, error_msg = result
+    if qn_text_ele is None:
+        return None, error_msg
+    return html.tostring(qn_text_ele, encoding="unicode"), None
+
+
+def _highlight(job: HighlightJob, answers_dict: Dict[str, str]) -> HighlightResult:
+    qn_text, answering_body, question_type = job
+    qn_text_ele = SPAN(CLASS("questionText"))
+    qn_text_ele.text = qn_text
+    try:
+        addHighlights(qn_text_ele, answering_body, question_type, answers_dict)
+    except Exception as e:
+        return None, str(e)
+    return qn_text_ele, None
+
+
+def _highlight_in_pool(
+    jobs: Iterable[HighlightJob],
+    answers_dict: Dict[str, str],
+    processes: Optional[int],
+) -> Iterator[HighlightFragment]:
+    job_iterator = iter(jobs)
+    chunks = iter(lambda: list(islice(job_iterator, CHUNK_SIZE)), [])
+    chunks_ahead = CHUNKS_AHEAD * (processes or os.cpu_count() or 1)
+    with ProcessPoolExecutor(
+        max_workers=processes,
+        initializer=_init_worker,
+        initargs=(answers_dict,),
+    ) as pool:
+        pending: Deque[Tuple[List[HighlightJob], Optional[Future]]] = deque()
+        for chunk in chunks:
+            try:
+                future: Optional[Future] = pool.submit(_highlight_chunk, chunk)
+            except (BrokenProcessPool, OSError):
+                future = None
+            pending.append((chunk, future))
+            if len(pending) > chunks_ahead:
+                yield from _chunk_fragments(*pending.popleft(), answers_dict)
+        while pending:
+            yield from _chunk_fragments(*pending.popleft(), answers_dict)
+
+
+def _chunk_fragments(
+    chunk: List[HighlightJob], future: Optional[Future], answers_dict: Dict[str, str]
+) -> List[HighlightFragment]:
+    if future is not None:
+        try:
+            return future.result()
+        except (BrokenProcessPool, OSError):
+            pass
+    # e.g. processes can't be started, just do it here instead
+    return [_serialise(_highlight(job, answers_dict)) for job in chunk]
+
+
+# answering bodies for the worker process, sent once rather than with every chunk
+_worker_answers_dict: Dict[str, str] = {}
+
+
+def _init_worker(answers_dict: Dict[str, str]):
+    global _worker_answers_dict
+    _worker_answers_dict = answers_dict
+
+
+def _highlight_chunk(jobs: List[HighlightJob]) -> List[HighlightFragment]:
+    return [_serialise(_highlight(job, _worker_answers_dict)) for job in jobs]
+
+
+def addHighlights(
+    qn_ele: _Element,
+    q_answering_body: str,
+    question_type: str,
+    answers_dict: Dict[str, str],
+) -> None:
+
+    # HIGHLIGHT IN YELLOW
+    # 1. any repetitions of the initial text of the question marked up e.g.
+    # ‘To ask The Chancellor of the Exchequer, To ask The Chancellor of the Exchequer’
+    # 2. any instances where the initial word after the first comma is upper cased
+    # (it should be lower cased) e.g. ‘To ask The Chancellor of the Exchequer, How many’
+    # 3. any absences of the initial text marked up e.g. missing
+    # ‘To ask The Chancellor of the Exchequer’
+    # 4. any absences of the initial comma marked up e.g.
+    # ‘To ask The Chancellor of the Exchequer how many’
+
+    # HIGHLIGHT IN PINK
+    # where To ask The... does not match the answering body
+
+    # sometimes the answering_body does not match the to ask the text
+    # here is what paul had to say about it:
+    # - occasionally we change the department a question is directed to but forget to change the title in the question or vice versa
+    # The heading does not show up in the app but I wonder whether the intro ‘To ask the ….’ could get highlighted (in a different colour to yellow) if it does not correspond with the department it has been allocated to.
+
+    qn_text = qn_ele.text
+    if not qn_text:
+        # we   wont do anything if there is no text
+        return
+
+    # This will only work on written questions
+    if question_type != "NAMEDDAY" and question_type != "ORDINARY":
+        return
+
+    segments: List[Segment] = []
+
+    target_not_found = False
+
+    # pink heighlight first
+    expected_target = answers_dict.get(q_answering_body, "")
+    to_ask = f"To ask {expected_target}"
+    if expected_target and qn_text.startswith(to_ask):
+        segments.append((to_ask, None))
+        qn_text = qn_text[len(to_ask) :]
+    else:
+        # not proper so we'll highlight in pink
+        # search for the (wrong) target used
+        pink_rule = HighlightRule(
+            "pink", "", "marker-pink", f"Expected {expected_target}"
+        )
+        for target in answers_dict.values():
+            to_ask = f"To ask {target}"
+            if qn_text.startswith(to_ask):
+                segments.append((to_ask, pink_rule))
+                qn_text = qn_text[len(to_ask) :]
+                break
+        else:  # loop exited normally i.e. didn't break
+            # we need to add something here as the question doesn't
+            # start with a target
+            target_not_found = True
+            first_chars = 6 if len(qn_text) > 6 else 1
+            segments.append((qn_text[:first_chars], pink_rule))
+            qn_text = qn_text[first_chars:]
+
+    if qn_text and not target_not_found and qn_text[0] != ",":
+        segments.append((qn_text[0], EXPECTED_COMMA))
+        qn_text = qn_text[1:]
+
+    # now apply the rules to the rest of the text in one pass
+    segments.extend(rule_segments(qn_text))
+
+    last_text, last_rule = segments[-1]
+    if last_rule is None and last_text[-1] != ".":
+        segments[-1:] = [(last_text[:-1], None), (last_text[-1], EXPECTED_FULL_STOP)]
+
+    render_segments(qn_ele, segments)
+
+
+def rule_segments(text: str) -> List[Segment]:
+    """Split text into plain text and the mistakes matched by RULES."""
+    segments: List[Segment] = []
+    position = 0
+    for match in RULES_PATTERN.finditer(text):
+        if match.start() > position:
+            segments.append((text[position : match.start()], None))
+        rule = RULES_BY_NAME[match.lastgroup]
+        segments.append((rule.show(match.group()), rule))
+        position = match.end()
+    if position < len(text):
+        segments.append((text[position:], None))
+    return segments
+
+
+def render_segments(qn_ele: _Element, segments: List[Segment]) -> None:
+    """Replace the content of qn_ele with the text and marker spans in segments."""
+    qn_ele.text = ""
+    last: Optional[_Element] = None
+    for text, rule in segments:
+        if rule is None:
+            if last is None:
+                qn_ele.text += text
+            else:
+                last.tail = (last.tail or "") + text
+            continue
+        last = SubElement(qn_ele, "span")
+        last.set("class", rule.css_class)
+        if rule.title is not None:
+            last.set("data-toggle", "tooltip")
+            last.set("title", rule.title)
+        last.text = text
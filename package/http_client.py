@@ -0,0 +1,179 @@
+"""
+Shared HTTP client for every outbound request made by Fawcett.
+
+All requests go through one `requests.Session` so connections (and TLS
+handshakes) are pooled and kept alive between calls. Transient errors are
+retried a bounded number of times with exponential backoff, within a time
+limit for the whole call, and each host has a simple circuit breaker so a
+flaky endpoint fails fast instead of making every subsequent request wait for
+its timeouts.
+"""
+
+# standard library imports
+import threading
+import time
+from typing import Dict, Optional, Tuple, Union
+from urllib.parse import urlsplit
+
+# 3rd party imports
+import requests
+from requests.adapters import HTTPAdapter
+
+# (connect timeout, read timeout) in seconds, keyed by host name
+ENDPOINT_TIMEOUTS: Dict[str, Tuple[float, float]] = {
+    "api.eqm.parliament.uk": (5, 30),
+    "services.orderpaper.parliament.uk": (5, 60),
+    "data.parliament.uk": (5, 30),
+}
+DEFAULT_TIMEOUT = (5, 30)
+
+# retry policy for transient errors. Waits are 0.5s, 1s, 2s between attempts
+MAX_RETRIES = 3
+BACKOFF_FACTOR = 0.5
+RETRY_STATUSES = (429, 500, 502, 503, 504)
+# a call gives up, retries and all, after this many seconds. The GUI waits
+# for calls so this bounds how long it can hang on one host
+MAX_TOTAL_TIME = 90
+
+# circuit breaker policy
+FAILURE_THRESHOLD = 3  # consecutive failed calls before the circuit opens
+RESET_AFTER = 60  # seconds before a single trial request is let through
+
+# size of the keep-alive pool
+POOL_CONNECTIONS = 4
+POOL_MAXSIZE = 8
+
+
+class CircuitOpenError(requests.exceptions.ConnectionError):
+    """Raised instead of making a request to a host that keeps failing."""
+
+
+class CircuitBreaker:
+    """Stop calling a host after repeated failures, try again after a while."""
+
+    def __init__(self, failure_threshold=FAILURE_THRESHOLD, reset_after=RESET_AFTER):
+        self.failure_threshold = failure_threshold
+        self.reset_after = reset_after
+        self.failures = 0
+        self.opened_at: Optional[float] = None
+        self._lock = threading.Lock()
+
+    def before_request(self, host: str):
+        with self._lock:
+            if self.opened_at is None:
+                return
+            if time.monotonic() - self.opened_at < self.reset_after:
+                raise CircuitOpenError(
+                    f"{host} has failed {self.failures} times in a row, "
+                    f"not trying again for {self.reset_after} seconds."
+                )
+            # half open: let this request through, a failure reopens the circuit
+            self.opened_at = None
+            self.failures = self.failure_threshold - 1
+
+    def record_success(self):
+        with self._lock:
+            self.failures = 0
+            self.opened_at = None
+
+    def record_failure(self):
+        with self._lock:
+            self.failures += 1
+            if self.failures >= self.failure_threshold:
+                self.opened_at = time.monotonic()
+
+
+_session: Optional[requests.Session] = None
+_session_lock = threading.Lock()
+_breakers: Dict[str, CircuitBreaker] = {}
+
+
+def get_session() -> requests.Session:
+    """Return the shared session, creating it on first use."""
+    global _session
+    with _session_lock:
+        if _session is None:
+            # retries are done by get, within MAX_TOTAL_TIME
+            adapter = HTTPAdapter(
+                pool_connections=POOL_CONNECTIONS,
+                pool_maxsize=POOL_MAXSIZE,
+            )
+            session = requests.Session()
+            session.mount("http://", adapter)
+            session.mount("https://", adapter)
+            _session = session
+        return _session
+
+
+def breaker_for(host: str) -> CircuitBreaker:
+    with _session_lock:
+        return _breakers.setdefault(host, CircuitBreaker())
+
+
+def get(url: str, timeout=None, **kwargs) -> requests.Response:
+    """GET `url` with the shared session.
+
+    Raises a `requests.RequestException` (or `CircuitOpenError`) if the
+    request fails or the response has an HTTP error status.
+    Any other keyword arguments are passed on to `requests.Session.get`.
+    """
+    host = urlsplit(url).hostname or ""
+    if timeout is None:
+        timeout = ENDPOINT_TIMEOUTS.get(host, DEFAULT_TIMEOUT)
+
+    breaker = breaker_for(host)
+    breaker.before_request(host)
+
+    try:
+        response = _get_with_retries(url, timeout, **kwargs)
+        response.raise_for_status()
+    except requests.HTTPError as e:
+        # only server side errors count against the host
+        if e.response is not None and e.response.status_code >= 500:
+            breaker.record_failure()
+        else:
+            breaker.record_success()
+        raise
+    except requests.RequestException:
+        breaker.record_failure()
+        raise
+
+    breaker.record_success()
+    return response
+
+
+def _get_with_retries(
+    url: str, timeout: Union[float, Tuple[float, float]], **kwargs
+) -> requests.Response:
+    """GET `url`, retrying connection errors, timeouts and RETRY_STATUSES.
+
+    Each attempt's timeouts are cut short so the call ends by MAX_TOTAL_TIME.
+    """
+    if isinstance(timeout, (int, float)):
+        timeout = (timeout, timeout)
+    deadline = time.monotonic() + MAX_TOTAL_TIME
+    attempt = 0
+    while True:
+        remaining = max(deadline - time.monotonic(), 0.1)
+        attempt_timeout = (min(timeout[0], remaining), min(timeout[1], remaining))
+        try:
+            response = get_session().get(url, timeout=attempt_timeout, **kwargs)
+        except (requests.ConnectionError, requests.Timeout):
+            if not _wait_to_retry(attempt, deadline):
+                raise
+        else:
+            if response.status_code not in RETRY_STATUSES:
+                return response
+            if not _wait_to_retry(attempt, deadline):
+                return response
+            response.close()
+        attempt += 1
+
+
+def _wait_to_retry(attempt: int, deadline: float) -> bool:
+    """Wait before retrying. False if there are no retries or time left."""
+    wait = BACKOFF_FACTOR * 2**attempt
+    if attempt >= MAX_RETRIES or time.monotonic() + wait >= deadline:
+        return False
+    time.sleep(wait)
+    return True
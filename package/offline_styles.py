@@ -0,0 +1,288 @@
+"""
+Styles for proofs that can be opened without a network connection.
+
+Proofs normally link to stylesheets on the internet: Bootstrap for Questions
+Tabled and the parliament design system for the Order Paper. Browsers wait
+for these before showing the page and, off the network, show it unstyled.
+`inline_styles` replaces the links with a single <style> element. That
+element holds the rules from a stylesheet below and from the page's own
+<style> elements, keeping only rules that can apply to the page, minified.
+
+The stylesheets below are small approximations of the linked ones and only
+cover the elements and classes the proofs use. The values in
+QUESTIONS_TABLED_CSS are taken from Bootstrap 4.6 (MIT licence).
+"""
+
+# standard library imports
+import re
+from typing import Iterable, List, Set, Tuple, Union
+
+# 3rd party imports
+from lxml import html as lhtml
+from lxml.etree import SubElement, _Element
+
+QUESTIONS_TABLED_CSS = """
+*, *::before, *::after { box-sizing: border-box; }
+html { font-family: sans-serif; line-height: 1.15; }
+body {
+  margin: 0;
+  font-family: -apple-system, BlinkMacSystemFont, "Segoe UI", Roboto,
+    "Helvetica Neue", Arial, sans-serif;
+  font-size: 1rem;
+  font-weight: 400;
+  line-height: 1.5;
+  color: #212529;
+  text-align: left;
+  background-color: #fff;
+}
+h1, h2, h3, h4, h5, h6 {
+  margin-top: 0;
+  margin-bottom: 0.5rem;
+  font-weight: 500;
+  line-height: 1.2;
+}
+h1 { font-size: 2.5rem; }
+h2 { font-size: 2rem; }
+h3 { font-size: 1.75rem; }
+h4 { font-size: 1.5rem; }
+h5 { font-size: 1.25rem; }
+p { margin-top: 0; margin-bottom: 1rem; }
+b, strong { font-weight: bolder; }
+small, .small { font-size: 80%; font-weight: 400; }
+a { color: #007bff; text-decoration: none; background-color: transparent; }
+a:hover { color: #0056b3; text-decoration: underline; }
+table { border-collapse: collapse; }
+.container {
+  width: 100%;
+  padding-right: 15px;
+  padding-left: 15px;
+  margin-right: auto;
+  margin-left: auto;
+}
+@media (min-width: 576px) {
+  .container { max-width: 540px; }
+  .col-sm-10 { flex: 0 0 83.333333%; max-width: 83.333333%; }
+}
+@media (min-width: 768px) { .container { max-width: 720px; } }
+@media (min-width: 992px) { .container { max-width: 960px; } }
+@media (min-width: 1200px) { .container { max-width: 1140px; } }
+.col-sm-10 {
+  position: relative;
+  width: 100%;
+  padding-right: 15px;
+  padding-left: 15px;
+}
+"""
+
+ORDER_PAPER_CSS = """
+*, *::before, *::after { box-sizing: border-box; }
+body {
+  margin: 0;
+  font-size: 1rem;
+  line-height: 1.5;
+  color: #222;
+  background-color: #fff;
+}
+a { color: #006e46; }
+h2, h3, h4 { margin: 1.5rem 0 0.75rem; line-height: 1.2; font-weight: 700; }
+h2 { font-size: 1.75rem; }
+p { margin: 0 0 0.75rem; }
+.container-fluid { width: 100%; padding: 0 15px; margin: 0 auto; }
+.block { padding: 1.5rem 0; }
+.row { display: flex; flex-wrap: wrap; }
+.col-md-9 { width: 100%; padding: 0 15px; }
+@media (min-width: 768px) { .col-md-9 { flex: 0 0 75%; max-width: 75%; } }
+.OP-left-margin { margin-left: 2.5rem; }
+.paraBusinessTodayChamberHeading {
+  font-size: 1.5rem;
+  text-transform: uppercase;
+  border-bottom: 1px solid #ccc;
+  padding-bottom: 0.25rem;
+}
+.paraBusinessSub-SectionHeading {
+  font-size: 1.25rem;
+  background-color: #eee;
+  padding: 0.25rem 0.5rem;
+}
+.FbaLocation { font-weight: 700; text-transform: uppercase; margin-top: 1rem; }
+.paraBusinessItemHeading,
+.paraBusinessItemHeading-bulleted,
+.paraFutureBusinessItemHeadingwithTiming {
+  font-weight: 700;
+  margin-top: 1rem;
+  margin-bottom: 0.25rem;
+}
+.paraBusinessItemHeading-bulleted::before { content: "\\2022\\00a0"; }
+.paraOrderofBusinessItemTiming { font-style: italic; }
+.paraBusinessListItem,
+.paraMotionText,
+.paraMinisterialStatement,
+.paraQuestion {
+  margin-left: 2.5rem;
+}
+.paraQuestion { text-indent: -2.5rem; }
+.paraMotionSponsor,
+.paraMotionSponsorGroup {
+  margin-left: 2.5rem;
+  font-weight: 700;
+  font-size: 0.875rem;
+}
+.paraNotesTag { font-weight: 700; font-size: 0.875rem; margin-bottom: 0; }
+.paraNotesText { font-size: 0.875rem; margin-left: 1rem; }
+.number-span { display: inline-block; width: 2.5rem; text-indent: 0; }
+.charBallotNumber { font-weight: 700; }
+.charMember, .charPresenterSponsor { font-weight: 700; }
+.charUIN { float: right; font-size: 0.875rem; }
+.charStandingOrderReference, .SponsorNotes { font-size: 0.875rem; }
+.from_cdata { display: block; }
+.from_cdata table { border-collapse: collapse; margin: 0.5rem 0; }
+.from_cdata td, .from_cdata th { border: 1px solid #ccc; padding: 0.25rem 0.5rem; }
+"""
+
+COMMENT = re.compile(r"/\*.*?\*/", re.DOTALL)
+WHITESPACE = re.compile(r"\s+")
+# spaces that are not needed around these characters in a selector
+SELECTOR_PUNCTUATION = re.compile(r"\s*([,>+~])\s*")
+# the parts of a selector: tags, .classes and #ids
+SELECTOR_NAMES = re.compile(r"([.#]?)(-?[_a-zA-Z][\w-]*)")
+# pseudo classes and elements, and attribute selectors, are ignored
+SELECTOR_IGNORED = re.compile(r"::?[\w-]+(\([^)]*\))?|\[[^\]]*\]")
+
+# a rule's selectors and declarations. For @media, its condition and rules
+Rule = Tuple[str, Union[str, list]]
+
+
+class UsedNames:
+    """The tags, classes and ids used in a page."""
+
+    def __init__(self):
+        self.tags: Set[str] = {"html", "body", "*"}
+        self.classes: Set[str] = set()
+        self.ids: Set[str] = set()
+
+    def add_elements(self, root: _Element):
+        for element in root.iter():
+            if not isinstance(element.tag, str):
+                # comments etc.
+                continue
+            self.tags.add(element.tag)
+            self.classes.update(element.get("class", "").split())
+            if element.get("id"):
+                self.ids.add(element.get("id"))
+
+    def matches(self, selector: str) -> bool:
+        """False if the selector can't match anything in the page."""
+        selector = SELECTOR_IGNORED.sub("", selector)
+        for prefix, name in SELECTOR_NAMES.findall(selector):
+            if prefix == ".":
+                names = self.classes
+            elif prefix == "#":
+                names = self.ids
+            else:
+                names = self.tags
+                name = name.lower()
+            if name not in names:
+                return False
+        return True
+
+
+def parse_rules(css: str) -> List[Rule]:
+    css = COMMENT.sub("", css)
+    rules: List[Rule] = []
+    position = 0
+    while True:
+        start = css.find("{", position)
+        if start == -1:
+            return rules
+        prelude = WHITESPACE.sub(" ", css[position:start]).strip()
+        if prelude.startswith("@"):
+            # find the matching close bracket
+            depth, end = 1, start + 1
+            while depth and end < len(css):
+                depth += {"{": 1, "}": -1}.get(css[end], 0)
+                end += 1
+            rules.append((prelude, parse_rules(css[start + 1 : end - 1])))
+            position = end
+        else:
+            end = css.find("}", start)
+            if end == -1:
+                end = len(css)
+            rules.append((prelude, css[start + 1 : end]))
+            position = end + 1
+
+
+def minify(rules: List[Rule], used: UsedNames) -> str:
+    """The rules that can apply to the page, with no unneeded white space."""
+    output = []
+    for prelude, body in rules:
+        if isinstance(body, list):
+            inner = minify(body, used)
+            if inner:
+                output.append(f"{prelude}{{{inner}}}")
+            continue
+
+        selectors = [
+            SELECTOR_PUNCTUATION.sub(r"\1", selector.strip())
+            for selector in prelude.split(",")
+        ]
+        selectors = [selector for selector in selectors if used.matches(selector)]
+        declarations = []
+        for declaration in str(body).split(";"):
+            name, _, value = declaration.partition(":")
+            if name.strip() and value.strip():
+                value = WHITESPACE.sub(" ", value.strip())
+                declarations.append(f"{name.strip()}:{value}")
+        if selectors and declarations:
+            output.append(f"{','.join(selectors)}{{{';'.join(declarations)}}}")
+    return "".join(output)
+
+
+def inline_styles(
+    html_root: _Element,
+    stylesheet: str,
+    extra_tags: Iterable[str] = (),
+    extra_classes: Iterable[str] = (),
+) -> None:
+    """Replace the external stylesheets and scripts in html_root with inline styles.
+
+    `extra_tags` and `extra_classes` are for elements that will be added to
+    the page after this is called (e.g. when it is written out a piece at a
+    time).
+    """
+    used = UsedNames()
+    used.add_elements(html_root)
+    used.tags.update(extra_tags)
+    used.classes.update(extra_classes)
+
+    css = [stylesheet]
+    for element in html_root.xpath("//link[@rel='stylesheet'] | //script[@src]"):
+        _remove(element)
+    for style in html_root.xpath("//style"):
+        # the page's own styles come after the stylesheet, as they did before
+        css.append(style.text or "")
+        _remove(style)
+
+    head = html_root.find("head")
+    if head is None:
+        head = html_root.makeelement("head", {})
+        html_root.insert(0, head)
+    SubElement(head, "style").text = minify(parse_rules("\n".join(css)), used)
+
+
+def with_inline_styles(html_text: str, stylesheet: str) -> str:
+    """A copy of the HTML document html_text with inline_styles applied."""
+    html_root = lhtml.document_fromstring(html_text)
+    inline_styles(html_root, stylesheet)
+    return lhtml.tostring(html_root, encoding="unicode")
+
+
+def _remove(element: _Element):
+    # keep the text after the element
+    parent = element.getparent()
+    if element.tail:
+        previous = element.getprevious()
+        if previous is not None:
+            previous.tail = (previous.tail or "") + element.tail
+        else:
+            parent.text = (parent.text or "") + element.tail
+    parent.remove(element)
@@ -3,14 +3,23 @@
 # Published 20 May 2022
 # https://github.com/hoc-ppu/order-paper-future-business-diff
 
+from copy import deepcopy
+from io import BytesIO
 import os
 from pathlib import Path
 import re
-from tempfile import mkdtemp
+import shutil
+from tempfile import gettempdir, mkdtemp
+import time
+from typing import Callable, List, Optional, Set
 import webbrowser
 
 from lxml import etree
-import requests
+import lxml.html as lhtml
+from requests import RequestException
+
+# shared HTTP client (keep-alive, retries and circuit breaker)
+import package.http_client as http_client
 
 # Scripts borrowed from the Order Paper production process
 # this is the brains of the part 1 operation
@@ -25,6 +34,21 @@ import package.get_announcements_xml_cmd_v2 as ann_script
 # this is the brains of the questions operation
 import package.TransformQuestionsXML_cmd as cmd_version
 
+# inline styles for proofs that work without the network
+from package.offline_styles import ORDER_PAPER_CSS, inline_styles
+
+# sections and a table of contents for very large proofs
+from package.sections import (
+    SECTION_CLASS,
+    TocGroup,
+    add_section_styles,
+    page_file_name,
+    page_links,
+    section_id,
+    toc_element,
+    use_sections,
+)
+
 # GLOBALS
 
 # Order Paper Data Services API key
@@ -38,15 +62,23 @@ BUSINESS_ENDPOINT_STEM = (
 # EQM endpoint stem
 QUESTIONS_ENDPOINT_STEM = "https://api.eqm.parliament.uk/" "feed/Xml/OrderPaper.xml"
 
-# Path to Temp folder in user's home folder
-# TEMP_DIR_PATH = str(Path(Path.home(), 'AppData/Local/Temp/').absolute())
-TEMP_DIR_PATH = Path(mkdtemp())
+# Each run gets its own folder (workspace) in here, in the Temp folder
+WORKSPACES_DIR = Path(gettempdir(), "fawcett-order-paper")
+
+# Number of workspaces to keep, so recent proofs can still be opened
+RETAIN_WORKSPACES = 10
+
+# Cached XML file name (in the workspace)
+BUSINESS_FILE_NAME = "business_temp.xml"
 
-# Cache XML in Temp folder
-TEMP_FILE_PATH_BUSINESS = TEMP_DIR_PATH.joinpath("business_temp.xml")
+# Output HTML file name (in the workspace)
+OUTPUT_FILE_NAME = "order_paper_preview.html"
 
-# Output HTML to Temp folder
-OUTPUT_FILE_PATH = TEMP_DIR_PATH.joinpath("order_paper_preview.html")
+# A workspace with this file in it is in use, by this or another process
+IN_USE_FILE_NAME = ".in-use"
+
+# Workspaces marked in use for longer than this (seconds) were left by a crash
+IN_USE_TIMEOUT = 60 * 60
 
 # Output HTML template, we'll populate this later
 OUTPUT_HTML_TEMPLATE = """
@@ -90,6 +122,84 @@ OUTPUT_HTML_TEMPLATE = """
 </html>
 """
 
+
+class Workspace:
+    """A folder for the files of one order paper proof.
+
+    Use as a context manager. Every run has its own workspace so runs can
+    happen at the same time (e.g. from different threads) without
+    overwriting each other's files. When the run finishes the XML files are
+    deleted and only the HTML proof is left, for the browser. If the run
+    fails the whole workspace is deleted. Starting a workspace deletes the
+    oldest ones so at most `retain` are kept. Workspaces still in use, e.g.
+    by a batch run in another process, are marked with a file and are not
+    deleted.
+    """
+
+    def __init__(self, parent: Path = WORKSPACES_DIR, retain=RETAIN_WORKSPACES):
+        self.parent = Path(parent)
+        self.retain = retain
+        self.path: Optional[Path] = None
+
+    def __enter__(self):
+        self.parent.mkdir(parents=True, exist_ok=True)
+        self.path = Path(mkdtemp(prefix="run-", dir=self.parent))
+        self.in_use_marker.touch()
+        self.prune()
+        return self
+
+    def __exit__(self, exc_type, exc_value, traceback):
+        if exc_type is None:
+            self.clean_up()
+            self.in_use_marker.unlink(missing_ok=True)
+        else:
+            shutil.rmtree(self.path, ignore_errors=True)
+        return False
+
+    @property
+    def in_use_marker(self) -> Path:
+        return self.path.joinpath(IN_USE_FILE_NAME)
+
+    @property
+    def business_xml(self) -> Path:
+        return self.path.joinpath(BUSINESS_FILE_NAME)
+
+    @property
+    def output_html(self) -> Path:
+        return self.path.joinpath(OUTPUT_FILE_NAME)
+
+    def transformed_xml(self, file_name_suffix: str) -> Path:
+        """Path of the XML written by a transform for the business XML."""
+        return self.path.joinpath(f"{self.business_xml.stem}{file_name_suffix}")
+
+    def clean_up(self) -> None:
+        """Delete everything except the HTML proof (and its other pages)."""
+        for file_path in self.path.iterdir():
+            if file_path.suffix != self.output_html.suffix:
+                if file_path != self.in_use_marker:
+                    file_path.unlink(missing_ok=True)
+
+    def prune(self) -> None:
+        """Delete the oldest workspaces, other than those in use."""
+        workspaces = sorted(self.parent.glob("run-*"), key=_modified_time, reverse=True)
+        for old_workspace in workspaces[self.retain :]:
+            if not _in_use(old_workspace):
+                shutil.rmtree(old_workspace, ignore_errors=True)
+
+
+def _in_use(workspace_path: Path) -> bool:
+    marked_for = time.time() - _modified_time(workspace_path.joinpath(IN_USE_FILE_NAME))
+    return marked_for < IN_USE_TIMEOUT
+
+
+def _modified_time(file_path: Path) -> float:
+    try:
+        return file_path.stat().st_mtime
+    except OSError:
+        # deleted by another run
+        return 0
+
+
 # Generate HTML element for each XML 'node' and return it as a string
 
 
@@ -187,18 +297,17 @@ def generate_html_element(node) -> str:
     return html
 
 
-def generate_html(requested_date) -> str:
+def business_nodes(business_xml_path: Path, questions_xml=None) -> list:
+    """The top level nodes of the business XML, with the transformed
+    questions (if any) in place of the QUESTIONS placeholder"""
 
-    html_fragment = ""
-
-    business_xml = etree.parse(str(TEMP_FILE_PATH_BUSINESS)).getroot()
+    business_xml = etree.parse(str(business_xml_path)).getroot()
 
     business_questions_element = business_xml.find("QUESTIONS")
 
     if business_questions_element is not None:
-        questions_xml = etree.parse(
-            f"{TEMP_DIR_PATH}/for_InDesign_Qs_{requested_date}.xml"
-        ).getroot()
+        if questions_xml is None:
+            questions_xml = etree.Element("root")
         business_questions_element_parent = business_questions_element.getparent()
         i = 0
         for node in questions_xml.xpath("/root/*"):
@@ -218,138 +327,374 @@ def generate_html(requested_date) -> str:
                 node,
             )
 
-    for node in business_xml.xpath("/root/*"):
+    return business_xml.xpath("/root/*")
+
+
+def generate_html(business_xml_path: Path, questions_xml=None) -> str:
+    """Generate HTML from the business XML, with the transformed
+    questions (if any) in place of the QUESTIONS placeholder"""
+
+    html_fragment = ""
+
+    for node in business_nodes(business_xml_path, questions_xml):
 
         html_fragment += generate_html_element(node)
 
     return html_fragment
 
 
-def rename_xml_file(source_file_name_suffix) -> None:
-    """Rename XML files generated by Order Paper scripts (for compatibility with the 'generate_html()' function)"""
+def generate_sectioned_html(nodes: list, page_size: Optional[int] = None) -> List[str]:
+    """Generate HTML from the business XML nodes, with each sub-section (e.g.
+    each day of FBA) in its own section and a table of contents before them.
+
+    Returns the HTML for each page. If `page_size` is given the sections are
+    split across pages of (at most) that many sections, otherwise there is
+    one page.
+    """
+
+    # sections of [headings before the section, section id, section HTML]
+    sections: List[List[str]] = []
+    # the table of contents with section ids instead of links for now
+    toc_groups: List[TocGroup] = []
+    used_ids: Set[str] = set()
+
+    headings = ""
+    # nodes after a main heading start a new section, even without a title
+    new_section = True
+
+    for node in nodes:
+
+        if node.tag == "OPHeading1":
+            headings += generate_html_element(node)
+            toc_groups.append(((node.text or "").strip(), []))
+            new_section = True
+            continue
+
+        if node.tag == "OPHeading2" or new_section:
+            title = (node.text or "").strip() if node.tag == "OPHeading2" else ""
+            new_id = section_id(title, used_ids)
+            if title:
+                if not toc_groups:
+                    toc_groups.append(("", []))
+                toc_groups[-1][1].append((title, new_id))
+            sections.append([headings, new_id, ""])
+            headings = ""
+            new_section = False
+
+        sections[-1][2] += generate_html_element(node)
+
+    if headings:
+        # headings with nothing after them
+        sections.append([headings, "", ""])
+
+    if page_size is None or page_size < 1:
+        page_size = max(len(sections), 1)
+    pages = [
+        sections[start : start + page_size]
+        for start in range(0, max(len(sections), 1), page_size)
+    ]
+    page_count = len(pages)
+
+    # now link the table of contents to the page each section is on
+    page_of_id = {}
+    for page_number, page in enumerate(pages, start=1):
+        for _, section_id_on_page, _ in page:
+            page_of_id[section_id_on_page] = page_number
+    for _, entries in toc_groups:
+        for index, (title, entry_id) in enumerate(entries):
+            href = f"#{entry_id}"
+            if page_count > 1:
+                page_name = page_file_name(OUTPUT_FILE_NAME, page_of_id[entry_id])
+                href = f"{page_name}{href}"
+            entries[index] = (title, href)
+
+    html_pages = []
+    for page_number, page in enumerate(pages, start=1):
+
+        html_fragment = ""
+
+        if page_count > 1:
+            links_html = lhtml.tostring(
+                page_links(OUTPUT_FILE_NAME, page_number, page_count),
+                encoding="unicode",
+            )
+            html_fragment += links_html
 
-    # source_file_name = path.basename(TEMP_FILE_PATH_BUSINESS).split('.')[0]
-    source_file_name = TEMP_FILE_PATH_BUSINESS.stem
-    # source_file_path = path.join(TEMP_DIR_PATH, source_file_name)
-    source_file_path = Path(
-        TEMP_DIR_PATH, f"{source_file_name}{source_file_name_suffix}"
-    )
+        if page_number == 1:
+            html_fragment += lhtml.tostring(toc_element(toc_groups), encoding="unicode")
 
-    # Delete any existing temp file with the same generic name
-    # os.remove(TEMP_FILE_PATH_BUSINESS)
-    TEMP_FILE_PATH_BUSINESS.unlink(missing_ok=True)
+        for headings, section_id_on_page, section_html in page:
+            html_fragment += headings
+            if section_id_on_page:
+                html_fragment += (
+                    f'<section class="{SECTION_CLASS}" id="{section_id_on_page}">\n'
+                    f"{section_html}</section>\n"
+                )
 
-    # Rename source temp XML file with generic name so it is compatible with the 'generate_html()' function
-    # os.rename(path.abspath(source_file_path +
-    #           source_file_name_suffix), TEMP_FILE_PATH_BUSINESS)
-    source_file_path.rename(TEMP_FILE_PATH_BUSINESS)
+        if page_count > 1:
+            html_fragment += links_html
 
+        html_pages.append(html_fragment)
 
-def order_paper(requested_date, shopping_list) -> None:
+    return html_pages
 
-    # We'll populate this as we go...
-    html_fragment = ""
 
-    # Loop over 'shopping_list'...
-    for requested_data in shopping_list:
+def write_page(
+    file_path: Path, html_fragment: str, sectioned=False, offline=False
+) -> str:
+    """Write an HTML file with html_fragment as its content. Returns the HTML."""
 
-        # Build appropriate url for API call
-        url = (
-            f"{BUSINESS_ENDPOINT_STEM}"
-            f"?key={API_KEY}&fromDate={requested_date}"
-            f"&type={requested_data}"
-        )
+    # Merge generated HTML fragment into OUTPUT_HTML_TEMPLATE
+    output_html = OUTPUT_HTML_TEMPLATE.format(CONTENT=html_fragment)
 
-        # If the shopping list item is not 'futurea'...
-        if requested_data != "futurea":
+    if sectioned or offline:
+        output_root = lhtml.document_fromstring(output_html)
+        if sectioned:
+            add_section_styles(output_root)
+        if offline:
+            inline_styles(output_root, ORDER_PAPER_CSS)
+        output_html = lhtml.tostring(output_root, encoding="unicode")
 
-            # Limit to querying for a single day's information
-            url += f"&toDate={requested_date}"
+    # Create/write HTML file
+    with open(file_path, "w", encoding="utf-8") as output_file:
+        output_file.write(output_html)
 
-        # Get data from the API
-        data = requests.get(url)
+    return output_html
 
-        # Write data to temporary file
-        with open(TEMP_FILE_PATH_BUSINESS, "wb") as f:
-            f.write(data.text.encode("utf-8"))
 
-        # If the shopping list item is 'effectives'...
-        if requested_data == "effectives":
+def rename_xml_file(workspace: Workspace, source_file_name_suffix) -> None:
+    """Rename XML files generated by Order Paper scripts (for compatibility with the 'generate_html()' function)"""
 
-            # Transform the XML into InDesign-friendly format
-            part1_script.process_xml(TEMP_FILE_PATH_BUSINESS, requested_date)
+    source_file_path = workspace.transformed_xml(source_file_name_suffix)
 
-            # This is the file name suffix given to the temporary XML file by the above function
-            # We'll need this later
-            file_name_suffix = "-effectives-for-InDesign.xml"
+    # Delete any existing temp file with the same generic name
+    workspace.business_xml.unlink(missing_ok=True)
 
-            # Build URL for another API call, this time to EQM for the day's questions
-            url = f"{QUESTIONS_ENDPOINT_STEM}" f"?sittingDate={requested_date}"
+    # Rename source temp XML file with generic name so it is compatible with the 'generate_html()' function
+    source_file_path.rename(workspace.business_xml)
 
-            text = "<root></root>"
 
-            # Get data from the API
-            try:
+def business_url(requested_date, requested_data=None, single_day=True) -> str:
+    """Build the tabled items URL. If `requested_data` is None no type is
+    given and items of every type are returned."""
 
-                data = requests.get(url, verify=False)
-                text = data.text
+    url = f"{BUSINESS_ENDPOINT_STEM}?key={API_KEY}&fromDate={requested_date}"
 
-            except (Exception):
+    if requested_data is not None:
+        url += f"&type={requested_data}"
 
-                pass  # fail silently
+    if single_day:
+        # Limit to querying for a single day's information
+        url += f"&toDate={requested_date}"
 
-            # Write data to temporary file
-            with open(f"{TEMP_DIR_PATH}/questions.xml", "wb") as f:
-                f.write(text.encode("utf-8"))
-
-            # Transform the XML into InDesign-friendly format
-            cmd_version.transform_xml(
-                f"{TEMP_DIR_PATH}/questions.xml",
-                output_folder=TEMP_DIR_PATH,
-                sitting_date=requested_date,
-            )
+    return url
 
-        if requested_data == "announcements":
 
-            # Transform the XML into InDesign-friendly format
-            ann_script.process_xml(TEMP_FILE_PATH_BUSINESS, requested_date)
+def print_warning(msg: str):
+    print(f"Warning: {msg}")
 
-            # This is the file name suffix given to the temporary XML file by the above function
-            # We'll need this later
-            file_name_suffix = "-announcements-for-InDesign.xml"
 
-        if requested_data == "futurea":
+def download_failed(url: str, e: Exception) -> str:
+    return (
+        f"Error getting data from:\n{url}\n{e}\n\n"
+        "Make sure you are connected to the parliament network."
+    )
 
-            # Transform the XML into InDesign-friendly format
-            fba_script.process_xml(TEMP_FILE_PATH_BUSINESS, requested_date)
 
-            # This is the file name suffix given to the temporary XML file by the above function
-            # We'll need this later
-            file_name_suffix = "-FBA-for-InDesign.xml"
+def order_paper(
+    requested_date,
+    shopping_list,
+    single_download=False,
+    open_browser=True,
+    offline=False,
+    sectioned: Optional[bool] = None,
+    page_size: Optional[int] = None,
+    warning: Callable[[str], None] = print_warning,
+    fba_processes: Optional[int] = 1,
+    rendered: Optional[Callable[[str], None]] = None,
+) -> Optional[Path]:
+    """Create and open an HTML proof of the sections in `shopping_list`.
 
-        # Rename temporary XML files for compatibility with 'generate_html()'
-        rename_xml_file(file_name_suffix)
+    If `single_download` is True, tabled items are downloaded once, covering
+    all the requested sections, and parsed once. Each transform then picks
+    out its own days and sections from the shared tree, so a three section
+    proof costs one request instead of three.
 
-        # Generate HTML fragment based on the InDesign-friendly XML
-        html_fragment += generate_html(requested_date)
+    Each call works in its own Workspace so calls can be made at the same
+    time. Returns the path to the HTML file. Pass `open_browser=False` to
+    skip opening it (e.g. when making proofs in a batch).
 
-    # Merge generated HTML fragments into OUTPUT_HTML_TEMPLATE
-    output_html = OUTPUT_HTML_TEMPLATE.format(CONTENT=html_fragment)
+    If `offline` is True the styles are put in the HTML file, instead of
+    being linked to, so it can be opened without the network.
 
-    # Create/write HTML file
-    with open(OUTPUT_FILE_PATH, "w", encoding="utf-8") as output_file:
-        output_file.write(output_html)
+    If `sectioned` is True each sub-section (e.g. each day of FBA) is put in
+    its own section, with a table of contents before them (see sections).
+    None does this for large proofs. If `page_size` is given the sections
+    are also split across linked pages of that many sections, in the same
+    workspace. The path returned is the first page's.
 
-    # Open HTML in new browser tab
-    # webbrowser.get().open(str(OUTPUT_FILE_PATH), new=2)
-    try:
-        if os.name == "posix":
-            webbrowser.open(f"file://{OUTPUT_FILE_PATH}", new=2)
+    If the business data can't be downloaded this is reported with `warning`
+    and None is returned.
+
+    `fba_processes` is passed on to the FBA transform. Values other than 1
+    build the FBA days in a pool of processes (None for one per CPU).
+
+    If given, `rendered` is called with the HTML written to the (first page's)
+    file, e.g. to show it in a preview without reading the file back.
+    """
+
+    with Workspace() as workspace:
+
+        # We'll populate this as we go...
+        nodes = []
+
+        # parsed business XML shared by all sections (single download only)
+        shared_root = None
+
+        if single_download and len(shopping_list) > 1:
+
+            # FBA needs every day from the requested date onwards
+            url = business_url(
+                requested_date, single_day="futurea" not in shopping_list
+            )
+
+            # Get data from the API
+            try:
+                data = http_client.get(url)
+            except RequestException as e:
+                warning(download_failed(url, e))
+                return None
+
+            # Write data to temporary file
+            with open(workspace.business_xml, "wb") as f:
+                f.write(data.content)
+
+            shared_root = etree.fromstring(data.content)
+
+        # Loop over 'shopping_list'...
+        for requested_data in shopping_list:
+
+            # transformed questions, only used for effectives
+            questions_root = None
+
+            # each transform gets its own copy of the shared tree, as they
+            # change it (e.g. part 1 removes Prayers)
+            input_root = None if shared_root is None else deepcopy(shared_root)
+
+            if shared_root is None:
+
+                # Build appropriate url for API call
+                # If the shopping list item is 'futurea' get all future days
+                url = business_url(
+                    requested_date,
+                    requested_data,
+                    single_day=requested_data != "futurea",
+                )
+
+                # Get data from the API
+                try:
+                    data = http_client.get(url)
+                except RequestException as e:
+                    warning(download_failed(url, e))
+                    return None
+
+                # Write data to temporary file
+                with open(workspace.business_xml, "wb") as f:
+                    f.write(data.text.encode("utf-8"))
+
+            # If the shopping list item is 'effectives'...
+            if requested_data == "effectives":
+
+                # Transform the XML into InDesign-friendly format
+                part1_script.process_xml(
+                    workspace.business_xml, requested_date, input_root=input_root
+                )
+
+                # This is the file name suffix given to the temporary XML file by the above function
+                # We'll need this later
+                file_name_suffix = "-effectives-for-InDesign.xml"
+
+                # Build URL for another API call, this time to EQM for the day's questions
+                url = f"{QUESTIONS_ENDPOINT_STEM}" f"?sittingDate={requested_date}"
+
+                text = "<root></root>"
+
+                # Get data from the API. The proof is still made without
+                # the questions if this fails
+                try:
+                    data = http_client.get(url)
+                    text = data.text
+                except RequestException as e:
+                    warning(download_failed(url, e))
+
+                # Transform the XML into InDesign-friendly format (in memory)
+                questions_root, questions_warnings = cmd_version.transform_tree(
+                    BytesIO(text.encode("utf-8")), sitting_date=requested_date
+                )
+                for questions_warning in questions_warnings:
+                    print_warning(questions_warning.message)
+
+            if requested_data == "announcements":
+
+                # Transform the XML into InDesign-friendly format
+                ann_script.process_xml(
+                    workspace.business_xml, requested_date, input_root=input_root
+                )
+
+                # This is the file name suffix given to the temporary XML file by the above function
+                # We'll need this later
+                file_name_suffix = "-announcements-for-InDesign.xml"
+
+            if requested_data == "futurea":
+
+                # Transform the XML into InDesign-friendly format
+                fba_script.process_xml(
+                    workspace.business_xml,
+                    requested_date,
+                    input_root=input_root,
+                    processes=fba_processes,
+                )
+
+                # This is the file name suffix given to the temporary XML file by the above function
+                # We'll need this later
+                file_name_suffix = "-FBA-for-InDesign.xml"
+
+            # Rename temporary XML files for compatibility with 'business_nodes()'
+            rename_xml_file(workspace, file_name_suffix)
+
+            # Collect the nodes of the InDesign-friendly XML
+            nodes += business_nodes(workspace.business_xml, questions_root)
+
+        # Generate HTML, for each page, based on the InDesign-friendly XML
+        sectioned = page_size is not None or use_sections(sectioned, len(nodes))
+        if sectioned:
+            html_pages = generate_sectioned_html(nodes, page_size)
         else:
-            webbrowser.open(str(OUTPUT_FILE_PATH))
-    except Exception:
-        # TODO: make this a GUI warning
-        print(
-            f"The following HTML file was created:\n{OUTPUT_FILE_PATH}\n"
-            "but could not be opened automatically."
-        )
+            html_pages = ["".join(generate_html_element(node) for node in nodes)]
+
+        for page_number, html_fragment in enumerate(html_pages, start=1):
+            page_path = workspace.path.joinpath(
+                page_file_name(OUTPUT_FILE_NAME, page_number)
+            )
+            output_html = write_page(page_path, html_fragment, sectioned, offline)
+            if page_number == 1 and rendered is not None:
+                rendered(output_html)
+
+    output_file_path = workspace.output_html
+
+    if open_browser:
+        # Open HTML in new browser tab
+        # webbrowser.get().open(str(output_file_path), new=2)
+        try:
+            if os.name == "posix":
+                webbrowser.open(f"file://{output_file_path}", new=2)
+            else:
+                webbrowser.open(str(output_file_path))
+        except Exception:
+            # TODO: make this a GUI warning
+            print(
+                f"The following HTML file was created:\n{output_file_path}\n"
+                "but could not be opened automatically."
+            )
+
+    return output_file_path
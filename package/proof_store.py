@@ -0,0 +1,133 @@
+"""
+A folder of the proofs made recently, kept to a limited size.
+
+Each proof is stored under its type, its date and a hash of the data it was
+made from. Making the same proof again from unchanged data reuses the stored
+file instead of writing a new one. Proofs not used for MAX_AGE seconds are
+deleted and, if the folder is bigger than MAX_BYTES, the least recently used
+proofs are deleted until it is not.
+"""
+
+# standard library imports
+from datetime import date
+import hashlib
+import os
+from pathlib import Path
+from tempfile import gettempdir, mkstemp
+import time
+from typing import BinaryIO, Callable, Optional
+
+STORE_DIR = Path(gettempdir(), "fawcett-proofs")
+
+MAX_BYTES = 200 * 1024 * 1024
+MAX_AGE = 14 * 24 * 60 * 60  # seconds
+
+# callers include the app's version in the parts they hash, so proofs made by
+# an older release are not reused. Change this if the proofs made from the
+# same data change without a new release (e.g. in development)
+STORE_VERSION = "1"
+
+# proofs still being written have this suffix
+PART_SUFFIX = ".part"
+
+
+def content_hash(*parts: bytes) -> str:
+    """Hash of the data a proof is made from."""
+    digest = hashlib.sha1(STORE_VERSION.encode("utf-8"))
+    for part in parts:
+        digest.update(hashlib.sha1(part).digest())
+    return digest.hexdigest()
+
+
+class ProofStore:
+    """The proofs in `directory`, looked up by (type, date, content hash)."""
+
+    def __init__(
+        self, directory: Path = STORE_DIR, max_bytes=MAX_BYTES, max_age=MAX_AGE
+    ):
+        self.directory = Path(directory)
+        self.max_bytes = max_bytes
+        self.max_age = max_age
+
+    def path_for(
+        self, proof_type: str, proof_date: date, digest: str, suffix: str
+    ) -> Path:
+        return self.directory.joinpath(
+            f"{proof_type}-{proof_date.isoformat()}-{digest[:16]}{suffix}"
+        )
+
+    def get(
+        self, proof_type: str, proof_date: date, digest: str, suffix: str
+    ) -> Optional[Path]:
+        """Return the stored proof, or None if there isn't one."""
+        proof_path = self.path_for(proof_type, proof_date, digest, suffix)
+        try:
+            # mark it as recently used
+            os.utime(proof_path)
+        except OSError:
+            return None
+        return proof_path
+
+    def write(
+        self,
+        proof_type: str,
+        proof_date: date,
+        digest: str,
+        suffix: str,
+        writer: Callable[[BinaryIO], bool],
+    ) -> Optional[Path]:
+        """Store the proof written to a file by `writer`.
+
+        If writer returns False nothing is stored and None is returned.
+        """
+        self.directory.mkdir(parents=True, exist_ok=True)
+        proof_path = self.path_for(proof_type, proof_date, digest, suffix)
+
+        # written to a temporary name first so an unfinished proof is never used
+        part_file, part_path = mkstemp(suffix=PART_SUFFIX, dir=self.directory)
+        try:
+            with open(part_file, "wb") as file:
+                written = writer(file)
+            if not written:
+                return None
+            os.replace(part_path, proof_path)
+        finally:
+            Path(part_path).unlink(missing_ok=True)
+
+        self.evict(keep=proof_path)
+        return proof_path
+
+    def evict(self, keep: Optional[Path] = None) -> None:
+        """Delete old proofs and then, if need be, the least recently used."""
+        now = time.time()
+        total_size = 0
+        proofs = []
+        for file_path in self.directory.iterdir():
+            try:
+                stat = file_path.stat()
+            except OSError:
+                # deleted by another process
+                continue
+            if file_path == keep:
+                total_size += stat.st_size
+                continue
+            if now - stat.st_mtime > self.max_age:
+                _delete(file_path)
+            elif file_path.suffix != PART_SUFFIX:
+                proofs.append((stat.st_mtime, stat.st_size, file_path))
+
+        total_size += sum(size for _, size, _ in proofs)
+        for _, size, file_path in sorted(proofs):
+            if total_size <= self.max_bytes:
+                break
+            if _delete(file_path):
+                total_size -= size
+
+
+def _delete(file_path: Path) -> bool:
+    try:
+        file_path.unlink(missing_ok=True)
+    except OSError:
+        # e.g. open in Word on Windows
+        return False
+    return True
@@ -0,0 +1,116 @@
+"""
+Hand requests from new launches of Fawcett to one that is already running.
+
+When started with --resident, Fawcett keeps running in the system tray after
+its window is closed and listens on a local socket (a named pipe on
+Windows). Later launches, from the desktop or the command line, send their
+request there as a line of JSON and exit. The work is then done by the
+running copy, whose imports, HTTP connections and caches are already warm.
+"""
+
+# standard library imports
+import json
+import os
+from typing import Any, Callable, Dict
+
+# 3rd party imports
+from PyQt5 import QtCore, QtNetwork
+
+# there can be one resident Fawcett for each user
+SERVER_NAME = f"fawcett-{os.getlogin()}"
+
+# milliseconds to wait for the resident Fawcett before doing the work here
+CONNECT_TIMEOUT = 500
+REPLY_TIMEOUT = 2000
+
+# e.g. {"command": "run", "date": "2022-05-20", "word": False}
+Request = Dict[str, Any]
+
+# the keys each command can have, besides "command", and their types
+REQUEST_KEYS: Dict[str, Dict[str, tuple]] = {
+    "show": {},
+    "run": {
+        "date": (str,),
+        "word": (bool,),
+        "offline": (bool,),
+        "sections": (bool, type(None)),
+    },
+}
+
+
+def is_valid_request(request: Any) -> bool:
+    """Whether request (parsed JSON) is a request the resident Fawcett can do."""
+    if not isinstance(request, dict):
+        return False
+    command = request.get("command")
+    if not isinstance(command, str) or command not in REQUEST_KEYS:
+        return False
+    keys = REQUEST_KEYS[command]
+    for key, value in request.items():
+        if key != "command" and not isinstance(value, keys.get(key, ())):
+            return False
+    # a run needs a date
+    return command != "run" or "date" in request
+
+
+def send_request(request: Request) -> bool:
+    """Send request to the resident Fawcett. Returns False if there isn't one."""
+    socket = QtNetwork.QLocalSocket()
+    socket.connectToServer(SERVER_NAME)
+    if not socket.waitForConnected(CONNECT_TIMEOUT):
+        return False
+
+    socket.write(json.dumps(request).encode("utf-8") + b"\n")
+    socket.waitForBytesWritten(REPLY_TIMEOUT)
+
+    # the resident Fawcett replies as soon as it has the request
+    while not socket.canReadLine():
+        if not socket.waitForReadyRead(REPLY_TIMEOUT):
+            return False
+    accepted = bytes(socket.readLine()).strip() == b"ok"
+
+    socket.disconnectFromServer()
+    return accepted
+
+
+class ResidentServer(QtCore.QObject):
+    """Listen for requests from other launches and pass them to `handler`."""
+
+    def __init__(self, handler: Callable[[Request], None], parent=None):
+        super().__init__(parent)
+        self.handler = handler
+        self.server = QtNetwork.QLocalServer(self)
+        # don't accept requests from other users
+        self.server.setSocketOptions(QtNetwork.QLocalServer.UserAccessOption)
+        self.server.newConnection.connect(self._accept)
+
+    def listen(self) -> bool:
+        # only call this if send_request has found no resident Fawcett.
+        # a socket can be left behind if it crashed (not on Windows)
+        QtNetwork.QLocalServer.removeServer(SERVER_NAME)
+        return self.server.listen(SERVER_NAME)
+
+    def _accept(self):
+        while self.server.hasPendingConnections():
+            socket = self.server.nextPendingConnection()
+            socket.readyRead.connect(lambda socket=socket: self._read(socket))
+            socket.disconnected.connect(socket.deleteLater)
+
+    def _read(self, socket: QtNetwork.QLocalSocket):
+        if not socket.canReadLine():
+            # wait for the rest of the line
+            return
+        try:
+            request = json.loads(bytes(socket.readLine()).decode("utf-8"))
+        except ValueError:
+            request = None
+        if not is_valid_request(request):
+            socket.disconnectFromServer()
+            return
+
+        socket.write(b"ok\n")
+        socket.flush()
+        socket.disconnectFromServer()
+
+        # do the work after the other launch has been told it can exit
+        QtCore.QTimer.singleShot(0, lambda: self.handler(request))
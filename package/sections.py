@@ -0,0 +1,121 @@
+"""
+Sections, a table of contents and linked pages for very large proofs.
+
+A full FBA or a post-recess Questions Tabled proof is one long page that
+browsers lay out all at once before showing anything. In a sectioned proof
+each day (Order Paper) or answering body (Questions Tabled) is in its own
+<section> with `content-visibility: auto`, so browsers only lay out the
+sections near the screen. Find in page and printing still see everything.
+A table of contents at the top links to each section and, for the Order
+Paper, the sections can also be split across several linked pages.
+"""
+
+# standard library imports
+import re
+from typing import List, Optional, Set, Tuple
+
+# 3rd party imports
+from lxml.etree import SubElement, _Element
+from lxml.html.builder import A, CLASS, E, LI, P, STRONG, UL
+
+# proofs with at least this many items are sectioned unless told otherwise
+SECTIONS_MIN_ITEMS = 1000
+
+SECTION_CLASS = "proof-section"
+TOC_CLASS = "proof-toc"
+PAGES_CLASS = "proof-pages"
+
+# id of the table of contents
+CONTENTS_ID = "contents"
+
+# the classes above, for inline_styles
+SECTION_CLASSES = (SECTION_CLASS, TOC_CLASS, PAGES_CLASS)
+SECTION_TAGS = ("section", "nav", "ul", "li", "a", "p", "span", "strong")
+
+# contain-intrinsic-size is a guess at a section's height until it has been
+# laid out, after which browsers remember the real one (auto)
+SECTION_CSS = """
+.proof-section { content-visibility: auto; contain-intrinsic-size: auto 1500px; }
+.proof-toc { margin: 1rem 0 2rem; }
+.proof-toc ul { list-style: none; padding-left: 1rem; margin-bottom: 0; }
+.proof-pages { margin: 1.5rem 0; }
+.proof-pages a { margin-right: 1rem; }
+"""
+
+NOT_ID_CHARACTERS = re.compile(r"[^a-z0-9]+")
+
+# (title, href) for a link in the table of contents
+TocEntry = Tuple[str, str]
+# a heading (or "") and the entries under it
+TocGroup = Tuple[str, List[TocEntry]]
+
+
+def use_sections(sectioned: Optional[bool], number_of_items: int) -> bool:
+    """Whether to section a proof. `sectioned` None means decide by size."""
+    if sectioned is None:
+        return number_of_items >= SECTIONS_MIN_ITEMS
+    return sectioned
+
+
+def section_id(title: str, used_ids: Set[str]) -> str:
+    """An id, for a section with this title, that is not in used_ids."""
+    base_id = NOT_ID_CHARACTERS.sub("-", title.lower()).strip("-") or "section"
+    base_id = f"s-{base_id}"
+    new_id = base_id
+    number = 1
+    while new_id in used_ids:
+        number += 1
+        new_id = f"{base_id}-{number}"
+    used_ids.add(new_id)
+    return new_id
+
+
+def add_section_styles(html_root: _Element) -> None:
+    """Add the styles for sections to the head of html_root.
+
+    Call this before inline_styles so they are kept in offline proofs.
+    """
+    head = html_root.find("head")
+    if head is None:
+        head = html_root.makeelement("head", {})
+        html_root.insert(0, head)
+    SubElement(head, "style").text = SECTION_CSS
+
+
+def toc_element(groups: List[TocGroup]) -> _Element:
+    """The table of contents, as a nav element."""
+    toc_list = UL()
+    for heading, entries in groups:
+        entry_list = toc_list
+        if heading:
+            group_item = LI(heading)
+            toc_list.append(group_item)
+            if entries:
+                entry_list = SubElement(group_item, "ul")
+        for title, href in entries:
+            entry_list.append(LI(A(title, href=href)))
+    return E.nav(CLASS(TOC_CLASS), P(STRONG("Contents")), toc_list, id=CONTENTS_ID)
+
+
+def page_file_name(first_page_name: str, page_number: int) -> str:
+    """e.g. proof.html, proof-2.html, proof-3.html"""
+    if page_number == 1:
+        return first_page_name
+    stem, dot, suffix = first_page_name.rpartition(".")
+    return f"{stem}-{page_number}{dot}{suffix}"
+
+
+def page_links(first_page_name: str, page_number: int, page_count: int) -> _Element:
+    """Links to the table of contents and the pages either side."""
+    links = E.nav(CLASS(PAGES_CLASS))
+    links.append(A("Contents", href=f"{first_page_name}#{CONTENTS_ID}"))
+    if page_number > 1:
+        links.append(
+            A("Previous page", href=page_file_name(first_page_name, page_number - 1))
+        )
+    if page_number < page_count:
+        links.append(
+            A("Next page", href=page_file_name(first_page_name, page_number + 1))
+        )
+    SubElement(links, "span").text = f"Page {page_number} of {page_count}"
+    return links
@@ -0,0 +1,83 @@
+import os
+import time
+
+import pytest
+import requests
+
+import package.answering_bodies as answering_bodies
+
+SNAPSHOT = (
+    b"<AnsweringBodies><AnsweringBody><ShortName>Treasury</ShortName>"
+    b"<Target>the Chancellor of the Exchequer</Target></AnsweringBody>"
+    b"</AnsweringBodies>"
+)
+
+
+class Response:
+    content = SNAPSHOT
+
+
+@pytest.fixture
+def cache_dir(tmp_path, monkeypatch):
+    monkeypatch.setattr(answering_bodies, "CACHE_DIR", tmp_path)
+    monkeypatch.setattr(answering_bodies, "SNAPSHOT_PATH", tmp_path / "snapshot.xml")
+    monkeypatch.setattr(answering_bodies, "SORT_ORDER_PATH", tmp_path / "order.json")
+    monkeypatch.setattr(answering_bodies, "OVERRIDE_PATH", tmp_path / "override.txt")
+    return tmp_path
+
+
+@pytest.fixture
+def mnis_calls(monkeypatch):
+    calls = []
+
+    def get(url, **kwargs):
+        calls.append(url)
+        return Response()
+
+    monkeypatch.setattr(answering_bodies.http_client, "get", get)
+    return calls
+
+
+def test_saved_snapshot_is_used_without_fetching(cache_dir, mnis_calls):
+    answering_bodies.SNAPSHOT_PATH.write_bytes(SNAPSHOT)
+
+    headings = answering_bodies.answering_body_headings()
+
+    assert headings["Treasury"] == ("The Chancellor of the Exchequer", 0)
+    assert mnis_calls == []
+
+
+def test_missing_snapshot_is_fetched_and_saved(cache_dir, mnis_calls):
+    headings = answering_bodies.answering_body_headings()
+
+    assert headings["Treasury"][0] == "The Chancellor of the Exchequer"
+    assert len(mnis_calls) == 1
+    assert answering_bodies.SNAPSHOT_PATH.read_bytes() == SNAPSHOT
+
+
+def test_old_snapshot_is_used_if_mnis_fails(cache_dir, monkeypatch):
+    answering_bodies.SNAPSHOT_PATH.write_bytes(SNAPSHOT)
+    old = time.time() - answering_bodies.SNAPSHOT_MAX_AGE - 60
+    os.utime(answering_bodies.SNAPSHOT_PATH, (old, old))
+
+    def get(url, **kwargs):
+        raise requests.ConnectionError("MNIS is down")
+
+    monkeypatch.setattr(answering_bodies.http_client, "get", get)
+
+    assert answering_bodies.current_snapshot() == SNAPSHOT
+
+
+def test_unknown_answering_body_sorts_last():
+    headings = answering_bodies.AnsweringBodyHeadings(
+        {"Treasury": "the Chancellor of the Exchequer", "Home Office": "Home Secretary"},
+        ["Home Secretary", "The Chancellor of the Exchequer"],
+    )
+
+    assert headings["Department for Something New"] == ("Department for Something New", 2)
+    names = ["Department for Something New", "Treasury", "Home Office"]
+    assert sorted(names, key=lambda name: headings[name][1]) == [
+        "Home Office",
+        "Treasury",
+        "Department for Something New",
+    ]
@@ -0,0 +1,50 @@
+from io import BytesIO
+import zipfile
+
+from lxml import etree, html
+
+from package.docx_writer import W, write_docx
+
+
+def document_paragraphs(html_text: str) -> list:
+    """The text of each paragraph in the document.xml written for html_text."""
+    docx = BytesIO()
+    write_docx(html.document_fromstring(html_text), docx)
+    with zipfile.ZipFile(docx) as docx_zip:
+        document = etree.fromstring(docx_zip.read("word/document.xml"))
+    return ["".join(paragraph.itertext()) for paragraph in document.iter(W + "p")]
+
+
+def test_paragraphs_and_headings():
+    paragraphs = document_paragraphs(
+        "<html><body><h1>Title</h1><p>One <strong>bold</strong> word</p></body></html>"
+    )
+
+    assert paragraphs == ["Title", "One bold word"]
+
+
+def test_loose_text_and_tails_are_kept():
+    paragraphs = document_paragraphs(
+        "<html><body><div>Loose text <p>Para</p> tail text</div></body></html>"
+    )
+
+    assert paragraphs == ["Loose text", "Para", "tail text"]
+
+
+def test_inline_elements_between_blocks():
+    paragraphs = document_paragraphs(
+        "<html><body><div><span>Before</span> and <b>after</b><br>"
+        "<p>Para</p>\n  \n<p>Next</p></div></body></html>"
+    )
+
+    # white space between blocks does not make an empty paragraph
+    assert paragraphs == ["Before and after", "Para", "Next"]
+
+
+def test_loose_text_in_table_cells():
+    paragraphs = document_paragraphs(
+        "<html><body><table><tr><td>Cell <p>Para</p> after</td></tr></table>"
+        "</body></html>"
+    )
+
+    assert paragraphs == ["Cell", "Para", "after"]
@@ -0,0 +1,41 @@
+from datetime import date
+
+from package.eqm_feed import count_questions, decode_feed
+
+EQM = [
+    {
+        "Date": "2026-10-19",
+        "Description": "Treasury",
+        "Questions": [{"Type": "ORDINARY", "UIN": "1", "DeclaredInterest": ""}],
+    },
+    {
+        "Date": "2026-10-20",
+        "Description": "Home Office",
+        "Questions": [
+            {"Type": "TOPICAL", "UIN": "2", "DeclaredInterest": ""},
+            {"Type": "TOPICAL", "UIN": "3", "DeclaredInterest": "yes"},
+        ],
+    },
+]
+
+
+def test_every_block_is_kept():
+    # including the block for the tabling date, 2026-10-19
+    blocks = decode_feed(EQM)
+
+    assert [block.date for block in blocks] == [date(2026, 10, 19), date(2026, 10, 20)]
+    assert count_questions(blocks) == {
+        "ORDINARY": 1,
+        "NAMEDDAY": 0,
+        "SUBSTANTIVE": 0,
+        "TOPICAL": 2,
+    }
+
+
+def test_question_labels():
+    first, second = decode_feed(EQM)[1].questions
+
+    assert first.number_label == "T1"
+    assert first.needs_highlighting
+    assert not second.needs_highlighting
+    assert second.uin_label == "[R] (3)"
@@ -0,0 +1,72 @@
+from datetime import date
+from io import BytesIO
+import os
+
+import pytest
+
+pytest.importorskip("PyQt5")
+try:
+    os.getlogin()
+except OSError:
+    pytest.skip("FawcettApp needs a login name", allow_module_level=True)
+
+import FawcettApp  # noqa: E402
+
+MNIS = {
+    "AnsweringBodies": {
+        "AnsweringBody": [
+            {"Name": "Treasury", "Target": "the Chancellor of the Exchequer"},
+            {"Name": "Home Office", "Target": "the Secretary of State for the Home"},
+        ]
+    }
+}
+
+
+def question(uin: int, text: str, answering_body: str, question_type="ORDINARY"):
+    return {
+        "Type": question_type,
+        "Member": f"Member {uin}",
+        "Constituency": "Place",
+        "Text": text,
+        "UIN": str(uin),
+        "IsTransfer": False,
+        "DeclaredInterest": "",
+        "AnsweringBody": answering_body,
+    }
+
+
+EQM = [
+    {
+        "Date": "2026-10-20",
+        "Description": "Treasury block",
+        "Questions": [
+            question(1, "To ask the Chancellor of the Exchequer, what.", "Treasury"),
+            question(2, "To ask the Chancellor, suggested redraft  it", "Treasury"),
+            question(3, "Text without a target.", "Treasury", "SUBSTANTIVE"),
+        ],
+    },
+    {
+        "Date": "2026-10-21",
+        "Description": "Home Office block",
+        "Questions": [
+            question(
+                4, "To ask the Secretary of State for the Home, what.", "Home Office"
+            ),
+            question(5, "To ask the Chancellor of the Exchequer, what.", "Home Office"),
+        ],
+    },
+]
+
+
+def test_stream_html_matches_build_up_html():
+    chosen_date = date(2026, 10, 19)
+    streamed = BytesIO()
+    assert FawcettApp.streamHTML(EQM, MNIS, chosen_date, streamed, sectioned=False)
+
+    built = BytesIO()
+    FawcettApp.buildUpHTML(EQM, MNIS, chosen_date).write(
+        built, encoding="UTF-8", method="html", doctype="<!DOCTYPE html>"
+    )
+
+    assert streamed.getvalue() == built.getvalue()
+    assert b"marker" in streamed.getvalue()
@@ -0,0 +1,116 @@
+import random
+import re
+
+from lxml import html
+
+import package.highlighting as highlighting
+from package.highlighting import RULES, highlight_fragments, rule_segments
+
+ANSWERS = {
+    "Treasury": "the Chancellor of the Exchequer",
+    "Home Office": "the Secretary of State for the Home Department",
+}
+
+WORDS = [
+    "what",
+    "steps",
+    "Suggested",
+    "redraft",
+    "suggested redraft",
+    "SUGGESTED REDRAFT",
+    "suggested  redraft",
+    "  ",
+    "\t",
+    "policy",
+    "the",
+]
+
+
+def rule_by_rule(text: str):
+    """The rules applied one after another, each to the text left unmarked."""
+    segments = [(text, None)]
+    for rule in RULES:
+        new_segments = []
+        for segment_text, segment_rule in segments:
+            if segment_rule is not None:
+                new_segments.append((segment_text, segment_rule))
+                continue
+            position = 0
+            for match in re.finditer(rule.pattern, segment_text, re.IGNORECASE):
+                if match.start() > position:
+                    new_segments.append((segment_text[position : match.start()], None))
+                new_segments.append((rule.show(match.group()), rule))
+                position = match.end()
+            if position < len(segment_text):
+                new_segments.append((segment_text[position:], None))
+        segments = new_segments
+    return segments
+
+
+def random_texts(count: int, seed=1):
+    rnd = random.Random(seed)
+    return [
+        " ".join(rnd.choice(WORDS) for _ in range(rnd.randint(1, 12)))
+        for _ in range(count)
+    ]
+
+
+def test_one_scan_matches_rule_by_rule():
+    for text in random_texts(500):
+        assert rule_segments(text) == rule_by_rule(text), text
+
+
+def test_highlighted_question():
+    job = (
+        "To ask the Chancellor of the Exchequer, what suggested redraft  he has",
+        "Treasury",
+        "ORDINARY",
+    )
+
+    qn_text_ele, error_msg = highlighting.highlight_questions([job], ANSWERS)[0]
+
+    assert error_msg is None
+    assert html.tostring(qn_text_ele, encoding="unicode") == (
+        '<span class="questionText">To ask the Chancellor of the Exchequer, what '
+        '<span class="marker">SUGGESTED REDRAFT</span>'
+        '<span class="marker" data-toggle="tooltip" title="More than one space">'
+        "\u00a0\u00a0</span>he ha"
+        '<span class="marker" data-toggle="tooltip" title="Expected full stop">'
+        "s</span></span>"
+    )
+
+
+def questions(count: int):
+    rnd = random.Random(2)
+    targets = list(ANSWERS.values())
+    return [
+        (
+            f"To ask {rnd.choice(targets)}{rnd.choice([',', ''])} {text}.",
+            rnd.choice(list(ANSWERS)),
+            rnd.choice(["ORDINARY", "NAMEDDAY", "TOPICAL"]),
+        )
+        for text in random_texts(count, seed=3)
+    ]
+
+
+def test_pool_matches_serial(monkeypatch):
+    jobs = questions(40)
+    serial = [
+        highlighting._serialise(highlighting._highlight(job, ANSWERS)) for job in jobs
+    ]
+
+    monkeypatch.setattr(highlighting, "PARALLEL_THRESHOLD", 1)
+    monkeypatch.setattr(highlighting, "CHUNK_SIZE", 3)
+    chunks_from_pool = []
+    chunk_fragments = highlighting._chunk_fragments
+
+    def spy(chunk, future, answers_dict):
+        chunks_from_pool.append(future is not None and future.exception() is None)
+        return chunk_fragments(chunk, future, answers_dict)
+
+    monkeypatch.setattr(highlighting, "_chunk_fragments", spy)
+
+    pooled = list(highlight_fragments(iter(jobs), len(jobs), ANSWERS, processes=2))
+
+    assert pooled == serial
+    assert len(chunks_from_pool) == 14 and all(chunks_from_pool)
@@ -0,0 +1,122 @@
+import pytest
+import requests
+
+import package.http_client as http_client
+
+URL = "https://example.parliament.uk/feed"
+
+
+class Response:
+    def __init__(self, status_code: int):
+        self.status_code = status_code
+
+    def raise_for_status(self):
+        if self.status_code >= 400:
+            raise requests.HTTPError(f"{self.status_code}", response=self)
+
+    def close(self):
+        pass
+
+
+class Session:
+    """Gives each response (or raises each exception) in turn."""
+
+    def __init__(self, *outcomes):
+        self.outcomes = list(outcomes)
+        self.calls = 0
+
+    def get(self, url, timeout=None, **kwargs):
+        self.calls += 1
+        outcome = self.outcomes.pop(0)
+        if isinstance(outcome, Exception):
+            raise outcome
+        return Response(outcome)
+
+
+class Clock:
+    def __init__(self):
+        self.now = 1000.0
+
+    def monotonic(self):
+        return self.now
+
+    def sleep(self, seconds):
+        self.now += seconds
+
+
+@pytest.fixture
+def clock(monkeypatch):
+    clock = Clock()
+    monkeypatch.setattr(http_client.time, "monotonic", clock.monotonic)
+    monkeypatch.setattr(http_client.time, "sleep", clock.sleep)
+    monkeypatch.setattr(http_client, "_breakers", {})
+    return clock
+
+
+def use_session(monkeypatch, *outcomes) -> Session:
+    session = Session(*outcomes)
+    monkeypatch.setattr(http_client, "_session", session)
+    return session
+
+
+def test_server_errors_are_retried(clock, monkeypatch):
+    session = use_session(monkeypatch, 503, requests.ConnectionError("reset"), 200)
+
+    assert http_client.get(URL).status_code == 200
+    assert session.calls == 3
+    # waited 0.5s then 1s
+    assert clock.now == 1001.5
+
+
+def test_client_errors_are_not_retried_or_counted(clock, monkeypatch):
+    session = use_session(monkeypatch, *[404] * 5)
+
+    for _ in range(http_client.FAILURE_THRESHOLD + 1):
+        with pytest.raises(requests.HTTPError):
+            http_client.get(URL)
+
+    assert session.calls == http_client.FAILURE_THRESHOLD + 1
+    assert http_client.breaker_for("example.parliament.uk").opened_at is None
+
+
+def test_retries_stop_at_the_time_limit(clock, monkeypatch):
+    monkeypatch.setattr(http_client, "MAX_TOTAL_TIME", 1)
+    session = use_session(monkeypatch, 503, 503, 503, 503)
+
+    with pytest.raises(requests.HTTPError):
+        http_client.get(URL)
+
+    # the second wait (1s) would go past the limit
+    assert session.calls == 2
+
+
+def test_breaker_opens_half_opens_and_closes(clock, monkeypatch):
+    failures = [500] * (http_client.MAX_RETRIES + 1) * http_client.FAILURE_THRESHOLD
+    session = use_session(monkeypatch, *failures)
+    for _ in range(http_client.FAILURE_THRESHOLD):
+        with pytest.raises(requests.HTTPError):
+            http_client.get(URL)
+
+    # open: fails without a request
+    calls = session.calls
+    with pytest.raises(http_client.CircuitOpenError):
+        http_client.get(URL)
+    assert session.calls == calls
+
+    # half open after RESET_AFTER: one trial request, a failure reopens it
+    clock.now += http_client.RESET_AFTER
+    session.outcomes = [requests.ConnectionError("down")] * (
+        http_client.MAX_RETRIES + 1
+    )
+    with pytest.raises(requests.ConnectionError):
+        http_client.get(URL)
+    with pytest.raises(http_client.CircuitOpenError):
+        http_client.get(URL)
+
+    # a successful trial request closes it
+    clock.now += http_client.RESET_AFTER
+    session.outcomes = [200, 200]
+    assert http_client.get(URL).status_code == 200
+    assert http_client.get(URL).status_code == 200
+    breaker = http_client.breaker_for("example.parliament.uk")
+    assert breaker.opened_at is None and breaker.failures == 0
@@ -0,0 +1,129 @@
+from datetime import date
+
+from lxml import etree
+import lxml.html as lhtml
+
+from package.get_op_utility_functions2 import (
+    AID,
+    MAX_TABLE_WIDTH,
+    days_after,
+    dropns,
+    first_day,
+    html_table_to_indesign,
+    index_days,
+)
+
+
+def test_dropns_root_namespaces():
+    root = etree.fromstring(
+        b'<Days xmlns="urn:d" xmlns:i="urn:i"><Day i:nil="true" n="1"/></Days>'
+    )
+
+    dropns(root)
+
+    assert etree.tostring(root) == b'<Days><Day n="1"/></Days>'
+
+
+def test_dropns_namespaces_declared_lower_down():
+    root = etree.fromstring(
+        b'<Days><X xmlns:z="urn:z" z:foo="1"><z:Y/><!-- note --></X></Days>'
+    )
+
+    dropns(root)
+
+    assert etree.tostring(root) == b"<Days><X><Y/><!-- note --></X></Days>"
+
+
+DAYS = etree.fromstring(
+    b"<BusinessItems><Days>"
+    b"<Day n='1'><Date>2026-10-21T00:00:00</Date></Day>"
+    b"<Day n='2'><Date>2026-10-20T00:00:00</Date></Day>"
+    b"<Day n='3'><Date>2026-10-21T00:00:00</Date></Day>"
+    b"<Day n='4'><Date>not a date</Date></Day>"
+    b"</Days></BusinessItems>"
+)
+
+
+def day_numbers(day_elements) -> list:
+    return [day_element.get("n") for day_element in day_elements]
+
+
+def test_days_with_the_same_date_are_all_kept():
+    days = index_days(DAYS)
+
+    assert day_numbers(days[date(2026, 10, 21)]) == ["1", "3"]
+    assert first_day(days, date(2026, 10, 21)).get("n") == "1"
+    assert first_day(days, date(2026, 10, 22)) is None
+    assert day_numbers(days_after(days, date(2026, 10, 19))) == ["2", "1", "3"]
+    assert day_numbers(days_after(days, date(2026, 10, 20))) == ["1", "3"]
+
+
+def indesign_table(table_html: str):
+    table = html_table_to_indesign(lhtml.fragment_fromstring(table_html))
+    cells = [
+        (
+            cell.get(f"{{{AID}}}ccols"),
+            cell.get(f"{{{AID}}}crows"),
+            cell.findtext("DebateTimingRubric") or cell.text,
+        )
+        for cell in table
+    ]
+    return table.get(f"{{{AID}}}tcols"), table.get(f"{{{AID}}}trows"), cells
+
+
+def test_table_with_th_headers():
+    tcols, trows, cells = indesign_table(
+        "<table><tr><th>Time</th><th>Business</th></tr>"
+        "<tr><td>2pm</td><td>Debate</td></tr></table>"
+    )
+
+    assert (tcols, trows) == ("2", "2")
+    assert cells == [
+        ("1", "1", "Time"),
+        ("1", "1", "Business"),
+        ("1", "1", "2pm"),
+        ("1", "1", "Debate"),
+    ]
+
+
+def test_table_with_spanning_cells():
+    table = html_table_to_indesign(
+        lhtml.fragment_fromstring(
+            "<table><tbody>"
+            "<tr><td colspan='2'>Wide</td><td rowspan='2'>Tall</td></tr>"
+            "<tr><td>a</td><td>b</td></tr>"
+            "<tr><td>c</td><td colspan='2' rowspan='5'>Corner</td></tr>"
+            "</tbody></table>"
+        )
+    )
+
+    assert table.get(f"{{{AID}}}tcols") == "3"
+    assert table.get(f"{{{AID}}}trows") == "3"
+    cells = [
+        (cell.get(f"{{{AID}}}ccols"), cell.get(f"{{{AID}}}crows")) for cell in table
+    ]
+    # cells covered by a span are left out and the rowspan is cut to the table
+    assert cells == [
+        ("2", "1"),
+        ("1", "2"),
+        ("1", "1"),
+        ("1", "1"),
+        ("1", "1"),
+        ("2", "1"),
+    ]
+    widths = [float(cell.get(f"{{{AID}}}ccolwidth")) for cell in table]
+    assert widths[0] == MAX_TABLE_WIDTH / 3 * 2
+    assert [cell.findtext("DebateTimingRubric") for cell in table[:2]] == [
+        "Wide",
+        "Tall",
+    ]
+    assert [cell.text for cell in table[2:]] == ["a", "b", "c", "Corner"]
+
+
+def test_short_rows_are_padded():
+    tcols, trows, cells = indesign_table(
+        "<table><tr><td>1</td><td>2</td><td>3</td></tr><tr><td>4</td></tr></table>"
+    )
+
+    assert (tcols, trows) == ("3", "2")
+    assert [text for _, _, text in cells] == ["1", "2", "3", "4", None, None]
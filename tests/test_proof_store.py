@@ -0,0 +1,96 @@
+from datetime import date
+import os
+import time
+
+import package.proof_store as proof_store
+from package.proof_store import ProofStore, content_hash
+
+PROOF_DATE = date(2026, 10, 19)
+
+
+def writer(content: bytes):
+    def write(file) -> bool:
+        file.write(content)
+        return True
+
+    return write
+
+
+def store_proof(store: ProofStore, digest: str, content=b"x" * 10, age=0.0):
+    proof_path = store.write("Qs", PROOF_DATE, digest, ".html", writer(content))
+    used = time.time() - age
+    os.utime(proof_path, (used, used))
+    return proof_path
+
+
+def test_stored_proof_is_reused(tmp_path):
+    store = ProofStore(tmp_path)
+    proof_path = store_proof(store, "a" * 40, b"<html></html>")
+
+    assert store.get("Qs", PROOF_DATE, "a" * 40, ".html") == proof_path
+    assert proof_path.read_bytes() == b"<html></html>"
+    assert store.get("Qs", PROOF_DATE, "b" * 40, ".html") is None
+
+
+def test_failed_write_stores_nothing(tmp_path):
+    store = ProofStore(tmp_path)
+
+    assert store.write("Qs", PROOF_DATE, "a" * 40, ".html", lambda file: False) is None
+    assert list(tmp_path.iterdir()) == []
+
+
+def test_old_proofs_are_deleted(tmp_path):
+    store = ProofStore(tmp_path)
+    old = store_proof(store, "a" * 40, age=120)
+    recent = store_proof(store, "b" * 40, age=30)
+
+    store.max_age = 60
+    store.evict()
+
+    assert not old.exists()
+    assert recent.exists()
+
+
+def test_least_recently_used_are_deleted_over_max_bytes(tmp_path):
+    store = ProofStore(tmp_path)
+    oldest = store_proof(store, "a" * 40, age=30)
+    middle = store_proof(store, "b" * 40, age=20)
+    newest = store_proof(store, "c" * 40, age=10)
+
+    store.max_bytes = 25
+    store.evict()
+
+    assert [oldest.exists(), middle.exists(), newest.exists()] == [False, True, True]
+
+
+def test_keep_is_never_deleted(tmp_path):
+    store = ProofStore(tmp_path)
+    other = store_proof(store, "a" * 40, age=10)
+    kept = store_proof(store, "b" * 40, age=120)
+
+    store.max_bytes, store.max_age = 5, 60
+    store.evict(keep=kept)
+
+    # kept is too old and the store is too big even without the other proof
+    assert kept.exists()
+    assert not other.exists()
+
+
+def test_writing_a_proof_evicts_others(tmp_path):
+    store = ProofStore(tmp_path, max_bytes=15)
+    first = store_proof(store, "a" * 40, age=10)
+    second = store_proof(store, "b" * 40)
+
+    assert not first.exists()
+    assert second.exists()
+
+
+def test_hash_depends_on_the_version(monkeypatch):
+    data = b"feed"
+    digest = content_hash(b"6.0.0", data)
+
+    assert content_hash(b"6.0.0", data) == digest
+    assert content_hash(b"6.0.1", data) != digest
+
+    monkeypatch.setattr(proof_store, "STORE_VERSION", "2")
+    assert content_hash(b"6.0.0", data) != digest
@@ -0,0 +1,48 @@
+import os
+
+import pytest
+
+pytest.importorskip("PyQt5")
+try:
+    os.getlogin()
+except OSError:
+    pytest.skip("resident needs a login name", allow_module_level=True)
+
+from package.resident import is_valid_request  # noqa: E402
+
+
+@pytest.mark.parametrize(
+    "request_",
+    [
+        {"command": "show"},
+        {"command": "run", "date": "2022-05-20"},
+        {
+            "command": "run",
+            "date": "2022-05-20",
+            "word": False,
+            "offline": True,
+            "sections": None,
+        },
+    ],
+)
+def test_valid_requests(request_):
+    assert is_valid_request(request_)
+
+
+@pytest.mark.parametrize(
+    "request_",
+    [
+        ["run", "2022-05-20"],
+        "show",
+        None,
+        {},
+        {"command": ["run"]},
+        {"command": "delete"},
+        {"command": "run"},
+        {"command": "run", "date": 20220520},
+        {"command": "run", "date": "2022-05-20", "word": "yes"},
+        {"command": "show", "date": "2022-05-20"},
+    ],
+)
+def test_invalid_requests(request_):
+    assert not is_valid_request(request_)
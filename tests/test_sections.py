@@ -0,0 +1,100 @@
+import re
+
+from lxml import etree
+import lxml.html as lhtml
+
+from package.order_paper import OUTPUT_FILE_NAME, generate_sectioned_html, write_page
+from package.sections import (
+    SECTION_CSS,
+    SECTIONS_MIN_ITEMS,
+    page_file_name,
+    section_id,
+    use_sections,
+)
+
+DAYS = ["Monday 2 November", "Tuesday 3 November", "Monday 2 November"]
+ITEMS_PER_DAY = SECTIONS_MIN_ITEMS // 2
+
+
+def business_nodes() -> list:
+    nodes = []
+
+    def node(tag: str, text: str):
+        element = etree.Element(tag)
+        element.text = text
+        nodes.append(element)
+
+    node("OPHeading1", "A. Calendar of Business")
+    for day in DAYS:
+        node("OPHeading2", day)
+        for _ in range(ITEMS_PER_DAY):
+            node("NoteText", f"Item {len(nodes)}")
+    node("OPHeading1", "B. Remaining Orders")
+    node("NoteText", "Last item")
+    return nodes
+
+
+def item_texts(html_fragment: str) -> list:
+    return re.findall(r">\s*(Item \d+|Last item)<", html_fragment)
+
+
+def test_large_proofs_are_sectioned():
+    assert use_sections(None, SECTIONS_MIN_ITEMS)
+    assert not use_sections(None, SECTIONS_MIN_ITEMS - 1)
+    assert not use_sections(False, SECTIONS_MIN_ITEMS)
+    assert use_sections(True, 1)
+
+
+def test_section_ids_are_unique():
+    used_ids: set = set()
+
+    assert section_id("Monday 2 November", used_ids) == "s-monday-2-november"
+    assert section_id("Monday 2 November", used_ids) == "s-monday-2-november-2"
+    assert section_id("", used_ids) == "s-section"
+
+
+def test_sections_split_across_pages():
+    nodes = business_nodes()
+    assert len(nodes) > SECTIONS_MIN_ITEMS
+
+    pages = generate_sectioned_html(nodes, page_size=2)
+
+    # 3 days and the untitled section after the second main heading
+    assert len(pages) == 2
+    # no item is lost or repeated
+    expected = [node.text for node in nodes if node.tag == "NoteText"]
+    assert [text for page in pages for text in item_texts(page)] == expected
+
+    first_page = lhtml.fragment_fromstring(pages[0], create_parent="div")
+    toc_links = [
+        link.get("href") for link in first_page.find(".//nav[@id='contents']").iter("a")
+    ]
+    second_page = page_file_name(OUTPUT_FILE_NAME, 2)
+    assert toc_links == [
+        f"{OUTPUT_FILE_NAME}#s-monday-2-november",
+        f"{OUTPUT_FILE_NAME}#s-tuesday-3-november",
+        f"{second_page}#s-monday-2-november-2",
+    ]
+    section_ids = [section.get("id") for section in first_page.iter("section")]
+    assert section_ids == ["s-monday-2-november", "s-tuesday-3-november"]
+
+    # the pages link to each other at the top and bottom
+    assert pages[0].count(f'href="{second_page}"') == 2
+    assert pages[1].count(f'href="{OUTPUT_FILE_NAME}"') == 2
+    assert "Page 2 of 2" in pages[1]
+
+
+def test_one_page_without_page_size():
+    pages = generate_sectioned_html(business_nodes())
+
+    assert len(pages) == 1
+    assert 'href="#s-monday-2-november-2"' in pages[0]
+    assert "Page 1 of" not in pages[0]
+
+
+def test_written_page_has_section_styles(tmp_path):
+    page_path = tmp_path / OUTPUT_FILE_NAME
+
+    write_page(page_path, generate_sectioned_html(business_nodes())[0], sectioned=True)
+
+    assert SECTION_CSS in page_path.read_text(encoding="utf-8")
@@ -0,0 +1,132 @@
+from io import BytesIO
+
+from lxml import etree
+
+from package.TransformQuestionsXML_cmd import (
+    stream_transform,
+    transform_tree,
+    transform_xml,
+)
+
+
+def order_paper_xml(oral_question: str) -> BytesIO:
+    return BytesIO(
+        (
+            "<OrderPaper><Questions><TargetGroup>"
+            "<TargetHead IsTopical='N'>the Secretary of State for Defence</TargetHead>"
+            "<Time>11:30 am</Time>"
+            f"{oral_question}"
+            "</TargetGroup></Questions></OrderPaper>"
+        ).encode("utf-8")
+    )
+
+
+MEMBER = (
+    "<Member><Title>Dr</Title><Fnames>Jane</Fnames><Sname>Smith</Sname>"
+    "<Constit>Place</Constit></Member>"
+)
+
+
+def warning_codes(warnings) -> list:
+    return [warning.code for warning in warnings]
+
+
+def test_well_formed_question():
+    output_root, warnings = transform_tree(
+        order_paper_xml(
+            f"<OralQn>{MEMBER}<QnRubric RID='N'/><UIN>9000</UIN>"
+            "<QnText PrintText='Y'> What steps he is taking. </QnText></OralQn>"
+        )
+    )
+
+    assert warnings == []
+    question = output_root.find("QuestionRestart")
+    assert question.findtext("Member") == "Dr Jane Smith"
+    assert question.findtext("QnText") == "What steps he is taking."
+    assert question.findtext("UIN") == " (9000)"
+
+
+def test_question_without_rubric():
+    output_root, warnings = transform_tree(
+        order_paper_xml(
+            f"<OralQn>{MEMBER}<UIN>9000</UIN>"
+            "<QnText PrintText='Y'>What steps he is taking.</QnText></OralQn>"
+        )
+    )
+
+    assert warning_codes(warnings) == ["missing-rubric"]
+    assert output_root.find("QuestionRestart").findtext("UIN") == " [R] (9000)"
+
+
+def test_question_without_text():
+    output_root, warnings = transform_tree(
+        order_paper_xml(f"<OralQn>{MEMBER}<QnRubric RID='N'/><UIN>9000</UIN></OralQn>")
+    )
+
+    assert warning_codes(warnings) == ["missing-question-text"]
+    question = output_root.find("QuestionRestart")
+    assert question.findtext("Member") == "Dr Jane Smith"
+    assert not question.findtext("QnText")
+
+
+def test_question_with_empty_text():
+    output_root, warnings = transform_tree(
+        order_paper_xml(
+            f"<OralQn>{MEMBER}<QnRubric RID='N'/><UIN>9000</UIN>"
+            "<QnText PrintText='Y'/></OralQn>"
+        )
+    )
+
+    assert warning_codes(warnings) == ["missing-question-text"]
+    assert output_root.find("QuestionRestart").findtext("QnText") == ""
+
+
+def test_unprinted_question_without_text_is_not_a_problem():
+    _, warnings = transform_tree(
+        order_paper_xml(
+            f"<OralQn>{MEMBER}<QnRubric RID='N'/><UIN>9000</UIN>"
+            "<QnText PrintText='N'/></OralQn>"
+        )
+    )
+
+    assert warnings == []
+
+
+def test_invalid_xml():
+    output_root, warnings = transform_tree(BytesIO(b"<OrderPaper><Questions>"))
+
+    assert warning_codes(warnings) == ["invalid-xml"]
+    assert len(output_root) == 0
+
+
+VALID_QUESTION = (
+    f"<OralQn>{MEMBER}<QnRubric RID='N'/><UIN>9000</UIN>"
+    "<QnText PrintText='Y'>What steps he is taking.</QnText></OralQn>"
+)
+
+
+def test_streaming_matches_transform_tree(tmp_path):
+    input_path = tmp_path / "OrderPaper.xml"
+    input_path.write_bytes(order_paper_xml(VALID_QUESTION).getvalue())
+
+    transform_xml(str(input_path), str(tmp_path), streaming=True)
+
+    output_root = etree.parse(str(tmp_path / "for_InDesign_Qs.xml")).getroot()
+    expected_root, _ = transform_tree(str(input_path))
+    assert etree.tostring(output_root) == etree.tostring(expected_root)
+    assert list(tmp_path.glob("*.part")) == []
+
+
+def test_streaming_truncated_input(tmp_path):
+    input_path = tmp_path / "OrderPaper.xml"
+    input_xml = order_paper_xml(VALID_QUESTION * 3).getvalue()
+    input_path.write_bytes(input_xml[: len(input_xml) - 40])
+    output_path = tmp_path / "for_InDesign_Qs.xml"
+    output_path.write_bytes(b"<root>previous output</root>")
+
+    warnings = stream_transform(str(input_path), str(output_path), output_path.name, "")
+
+    assert warning_codes(warnings) == ["invalid-xml"]
+    # the previous output is left alone and no partial output is left behind
+    assert output_path.read_bytes() == b"<root>previous output</root>"
+    assert list(tmp_path.glob("*.part")) == []